@@ -3,6 +3,7 @@ from application.app import app
 from application.classes.spot import Spot
 from application.services.gcode_service import GCodeService
 from application.services.gcode.gcode_helpers import resize_gcode_string
+from application.services.gcode.toolpath import MEDIA_TYPE as TOOLPATH_MEDIA_TYPE, toolpath_to_gcode
 
 @app.route("/", methods=["GET"])
 def root():
@@ -20,6 +21,9 @@ def root():
 def gcode():
     """
     POST /gcode
+
+    The G-code is either text in the `gcode` form field, or a binary toolpath uploaded as the
+    `toolpath` file or sent as the body with the toolpath content type.
     ---
     responses:
         200:
@@ -41,6 +45,10 @@ def gcode():
                                             'such as the estop SDK example, to configure E-Stop.'
 
         gcode_src = request.form.get('gcode', None)
+        if 'toolpath' in request.files:
+            gcode_src = toolpath_to_gcode(request.files['toolpath'].read())
+        elif request.mimetype == TOOLPATH_MEDIA_TYPE:
+            gcode_src = toolpath_to_gcode(request.get_data())
 
         result = gcodeService.run_gcode(
             gcode_src=gcode_src,
@@ -1,17 +1,39 @@
+import logging
+import math
 import time
 import traceback
 
+from google.protobuf import any_pb2
+
 from bosdyn import geometry
-from bosdyn.api import basic_command_pb2, geometry_pb2, trajectory_pb2
+from bosdyn.api import (
+    basic_command_pb2,
+    geometry_pb2,
+    mobility_command_pb2,
+    robot_command_pb2 as base_robot_command_pb2,
+    synchronized_command_pb2,
+    trajectory_pb2,
+)
 from bosdyn.api.spot import robot_command_pb2
 from bosdyn.client import robot_command
-from bosdyn.client.frame_helpers import ODOM_FRAME_NAME
+from bosdyn.client.frame_helpers import (
+    BODY_FRAME_NAME,
+    ODOM_FRAME_NAME,
+    get_se2_a_tform_b,
+)
+from bosdyn.client.math_helpers import SE2Pose
+from bosdyn.util import seconds_to_duration
 
 # TODO: ISSUE #145 Replace with config
 NAV_VELOCITY_MAX_YAW = 1.2  # rad/s
 NAV_VELOCITY_MAX_X = 1.0  # m/s
 NAV_VELOCITY_MAX_Y = 0.5  # m/s
 VELOCITY_CMD_DURATION = 6
+# Every leg of a path takes at least this long, so trajectory times keep increasing
+# even between identical waypoints
+MIN_LEG_DURATION = 0.1  # s
+
+LOGGER = logging.getLogger(__name__)
 
 
 def block_for_trajectory_cmd(
@@ -175,4 +197,191 @@ def move_command(
                 traceback.format_exc(),
             )
         else:
-            print('Exception throw in move_command', exc)
\ No newline at end of file
+            print('Exception throw in move_command', exc)
+
+
+def _check_velocity_limits(mobility_params):
+    """
+    Raises a ValueError unless every velocity limit is positive, leg durations divide by them.
+    """
+    max_vel = mobility_params.vel_limit.max_vel
+    limits = {"x": max_vel.linear.x, "y": max_vel.linear.y, "yaw": max_vel.angular}
+    for name, limit in limits.items():
+        if limit <= 0:
+            raise ValueError(f"Velocity limit for {name} must be positive, got {limit}")
+
+
+def _leg_duration(start_pose, end_pose, mobility_params) -> float:
+    """
+    Time in seconds for the body to cover one leg of a path at the given velocity limits.
+    The slowest of the x, y and yaw components sets the duration, never below MIN_LEG_DURATION.
+    """
+    max_vel = mobility_params.vel_limit.max_vel
+    start_T_end = start_pose.inverse() * end_pose
+    return max(
+        MIN_LEG_DURATION,
+        abs(start_T_end.x) / max_vel.linear.x,
+        abs(start_T_end.y) / max_vel.linear.y,
+        abs(start_T_end.angle) / max_vel.angular,
+    )
+
+
+def build_path_command(
+    frame_tree_snapshot, waypoints, mobility_params, frame=ODOM_FRAME_NAME
+):
+    """
+    Builds a single synchro SE2 trajectory command going through every waypoint.
+    Args:
+        frame_tree_snapshot: snapshot used to express the waypoints in `frame`
+        waypoints: list of (d_x, d_y, r_rot) tuples relative to the body at the time of the snapshot
+        mobility_params (MobilityParams): velocity limits and body control for the path
+        frame (str): frame the trajectory is sent in
+    Return values:
+        (command, leg_end_times) where leg_end_times[i] is the planned time in seconds at which
+        the body reaches waypoints[i].
+    """
+    _check_velocity_limits(mobility_params)
+    frame_T_body = get_se2_a_tform_b(frame_tree_snapshot, frame, BODY_FRAME_NAME)
+
+    points = []
+    leg_end_times = []
+    elapsed = 0.0
+    last_pose = SE2Pose(0.0, 0.0, 0.0)
+    for d_x, d_y, r_rot in waypoints:
+        body_T_goal = SE2Pose(d_x, d_y, r_rot)
+        elapsed += _leg_duration(last_pose, body_T_goal, mobility_params)
+        frame_T_goal = frame_T_body * body_T_goal
+        points.append(
+            trajectory_pb2.SE2TrajectoryPoint(
+                pose=frame_T_goal.to_proto(),
+                time_since_reference=seconds_to_duration(elapsed),
+            )
+        )
+        leg_end_times.append(elapsed)
+        last_pose = body_T_goal
+
+    request = basic_command_pb2.SE2TrajectoryCommand.Request(
+        trajectory=trajectory_pb2.SE2Trajectory(points=points),
+        se2_frame_name=frame,
+    )
+    params = any_pb2.Any()
+    params.Pack(mobility_params)
+    mobility_command = mobility_command_pb2.MobilityCommand.Request(
+        se2_trajectory_request=request, params=params
+    )
+    command = base_robot_command_pb2.RobotCommand(
+        synchronized_command=synchronized_command_pb2.SynchronizedCommand.Request(
+            mobility_command=mobility_command
+        )
+    )
+    return command, leg_end_times
+
+
+def path_progress(path, pose, first_leg=0):
+    """
+    Locates a body pose along a path of SE2Poses (the start pose followed by every waypoint).
+    The pose is projected onto the closest leg from first_leg on, so progress never goes back to a
+    leg already walked when the path crosses itself.
+    Return values:
+        (leg_index, fraction) where leg_index is the waypoint being walked to and fraction is the
+        share of the path's length covered, 0 for a path that only turns in place.
+    """
+    lengths = [math.hypot(end.x - start.x, end.y - start.y) for start, end in zip(path, path[1:])]
+    best = None
+    for leg in range(first_leg, len(lengths)):
+        start, end = path[leg], path[leg + 1]
+        share = 0.0
+        if lengths[leg] > 0:
+            share = ((pose.x - start.x) * (end.x - start.x) + (pose.y - start.y) * (end.y - start.y)) / lengths[leg] ** 2
+            share = min(max(share, 0.0), 1.0)
+        along = share * lengths[leg]
+        distance = math.hypot(
+            pose.x - (start.x + share * (end.x - start.x)), pose.y - (start.y + share * (end.y - start.y))
+        )
+        if best is None or distance < best[0]:
+            best = (distance, leg, along)
+
+    total = sum(lengths)
+    _, leg, along = best
+    fraction = (sum(lengths[:leg]) + along) / total if total > 0 else 0.0
+    return leg, fraction
+
+
+def move_along_path(
+    robot,
+    command_client,
+    waypoints,
+    mobility_params=None,
+    progress_callback=None,
+    timeout_margin_sec=2.0,
+    logger=None,
+) -> bool:
+    """
+    Moves the body through a list of waypoints with a single trajectory command.
+    Args:
+        waypoints: list of (d_x, d_y, r_rot) tuples in meters/radians, all relative to the body
+            at the time the command is sent (not to the previous waypoint)
+        mobility_params (MobilityParams): defaults to get_mobility_params()
+        progress_callback: optional callable(leg_index, fraction, status) called while moving.
+            leg_index is the waypoint being walked to and fraction the share of the path's length
+            covered, both from the body pose the robot reports, and status is the SE2 trajectory
+            feedback status of the command.
+        timeout_margin_sec (float): extra time allowed past the planned path duration
+    Return values:
+        True if the robot reports STATUS_AT_GOAL for the last waypoint, False otherwise.
+        Raises a ValueError when a velocity limit is not positive.
+    """
+    if not waypoints:
+        return True
+
+    if mobility_params is None:
+        mobility_params = get_mobility_params()
+    if logger is None:
+        logger = LOGGER
+    # Invalid limits are a caller error, raised rather than logged as a failed move
+    _check_velocity_limits(mobility_params)
+
+    try:
+        frame_tree_snapshot = robot.get_frame_tree_snapshot()
+        command, leg_end_times = build_path_command(
+            frame_tree_snapshot, waypoints, mobility_params
+        )
+        odom_T_body = get_se2_a_tform_b(frame_tree_snapshot, ODOM_FRAME_NAME, BODY_FRAME_NAME)
+        path = [odom_T_body] + [odom_T_body * SE2Pose(*waypoint) for waypoint in waypoints]
+
+        end_time = time.time() + leg_end_times[-1] + timeout_margin_sec
+        cmd_id = command_client.robot_command(command, end_time_secs=end_time)
+
+        leg_index = 0
+        while time.time() < end_time:
+            feedback_resp = command_client.robot_command_feedback(cmd_id)
+            status = (
+                feedback_resp.feedback.synchronized_feedback.mobility_command_feedback.se2_trajectory_feedback.status
+            )
+            at_goal = (
+                status == basic_command_pb2.SE2TrajectoryCommand.Feedback.STATUS_AT_GOAL
+            )
+
+            if progress_callback is not None:
+                if at_goal:
+                    leg_index, fraction = len(waypoints) - 1, 1.0
+                else:
+                    odom_T_body = get_se2_a_tform_b(
+                        robot.get_frame_tree_snapshot(), ODOM_FRAME_NAME, BODY_FRAME_NAME
+                    )
+                    leg_index, fraction = path_progress(path, odom_T_body, leg_index)
+                progress_callback(leg_index, fraction, status)
+
+            if at_goal:
+                return True
+
+            time.sleep(0.1)
+    except Exception as exc:
+        logger.error(
+            "An exception occurred while running move_along_path. "
+            + "Exception was: %s. Traceback was: %s",
+            exc,
+            traceback.format_exc(),
+        )
+
+    return False
@@ -37,7 +37,7 @@ from application.services.gcode.gcode_helpers import (
     resize_gcode_string
 )
 from application.services.gcode.fiducial import FollowFiducial
-from application.services.gcode.move import move_command
+from application.services.gcode.move import move_along_path
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -170,7 +170,11 @@ class GCodeService(Spot):
                 if result is None:
                     self.robot.logger.error('Unable to find fiducial at start of gcode program.')
 
-                move_command(self.robot, command_client, d_x=-.1)
+                # Back off the fiducial with a single body trajectory
+                if not move_along_path(
+                    self.robot, command_client, [(-.1, 0.0, 0.0)], logger=self.robot.logger
+                ):
+                    self.robot.logger.error('Unable to back off the fiducial at start of gcode program.')
 
             if (RUN_GCODE):
                 robot_state_client = self.robot.ensure_client(
@@ -67,19 +67,19 @@ const GCode: React.FC<{ item: string | undefined }> = ({ item = "" }) => {
     setResults4(undefined);
 
     const promises = [
-      generateGCode(input).then((results: any) => {
+      generateGCode(input, 0).then((results: any) => {
         setResults1(results);
         return results;
       }),
-      generateGCode(input).then((results: any) => {
+      generateGCode(input, 1).then((results: any) => {
         setResults2(results);
         return results;
       }),
-      generateGCode(input).then((results: any) => {
+      generateGCode(input, 2).then((results: any) => {
         setResults3(results);
         return results;
       }),
-      generateGCode(input).then((results: any) => {
+      generateGCode(input, 3).then((results: any) => {
         setResults4(results);
         return results;
       }),
@@ -3,10 +3,15 @@ import axios from "axios";
 const GCODE_GENERATION_API_URL =
   "https://workspace-xkdnsgx-team-5--vectorizer-model-web-vectorize.modal.run";
 
-export const generateGCode = async (item: string | undefined) => {
+// candidate tells apart parallel requests for the same item, each index is
+// cached as its own drawing
+export const generateGCode = async (
+  item: string | undefined,
+  candidate: number = 0
+) => {
   try {
     const response = await axios.get(
-      `${GCODE_GENERATION_API_URL}?item=${item}`
+      `${GCODE_GENERATION_API_URL}?item=${item}&candidate=${candidate}`
     );
 
     if (response) {
@@ -0,0 +1,127 @@
+# Batch vectorization as plain local Python.
+#
+#   python batch.py apple house cat
+#   python batch.py --stub --count 64 --workers 8
+#
+# Image generation fans out over threads (it is a remote call), tracing runs in a process pool
+# and results are yielded in completion order. With --stub, images come from a local generator
+# instead of the diffusion app so the pipeline can be load tested on CPU.
+import argparse
+import queue
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from engine import trace_image
+
+
+def diffusion_image(item):
+    import modal
+
+    diffusion_function = modal.Function.lookup("stable-diffusion-xl", "Model.inference")
+    return diffusion_function.remote(item=item).getvalue()
+
+
+def stub_array(item, size=1024):
+    # Deterministic line-art icon for an item as uint8 RGB pixels.
+    rng = np.random.default_rng(zlib.crc32(item.encode()))
+    image = np.full((size, size, 3), 255, np.uint8)
+    for _ in range(rng.integers(3, 8)):
+        center = tuple(int(v) for v in rng.integers(size // 5, 4 * size // 5, 2))
+        if rng.random() < 0.5:
+            cv2.circle(image, center, int(rng.integers(size // 20, size // 4)), (0, 0, 0), 12)
+        else:
+            polygon = rng.integers(0, size, (int(rng.integers(3, 7)), 2)).astype(np.int32)
+            cv2.polylines(image, [polygon], True, (0, 0, 0), 12)
+    return image
+
+
+def stub_image(item, size=1024, latency=0.0):
+    # stub_array encoded as JPEG like the diffusion output.
+    time.sleep(latency)
+    stream = BytesIO()
+    Image.fromarray(stub_array(item, size)).save(stream, format="JPEG")
+    return stream.getvalue()
+
+
+def vectorize_batch(items=(), images=(), generate_image=diffusion_image, max_workers=None,
+                    generation_workers=8, **options):
+    # Yields one result per item or image, in completion order. Results for items carry the
+    # "item", results for images their "index" in `images`. Failures carry an "error" instead
+    # of the G-code. `options` are passed on to trace_image.
+    results = queue.Queue()
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(generation_workers) as generation_pool, \
+            ProcessPoolExecutor(max_workers) as trace_pool:
+
+        def collect(key, future):
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"error": str(e)}
+            result.update(key)
+            result["seconds"] = time.perf_counter() - started
+            results.put(result)
+
+        def trace(key, image_bytes):
+            future = trace_pool.submit(trace_image, image_bytes, **options)
+            future.add_done_callback(lambda f: collect(key, f))
+
+        def generated(key, future):
+            if future.exception() is not None:
+                collect(key, future)
+            else:
+                trace(key, future.result())
+
+        for item in items:
+            future = generation_pool.submit(generate_image, item)
+            future.add_done_callback(lambda f, item=item: generated({"item": item}, f))
+
+        for index, image_bytes in enumerate(images):
+            trace({"index": index}, image_bytes)
+
+        for _ in range(len(items) + len(images)):
+            yield results.get()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("items", nargs="*", help="Items to draw")
+    parser.add_argument("--stub", action="store_true", help="Generate images locally instead of with diffusion")
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="Seconds each stub image takes")
+    parser.add_argument("--count", type=int, default=0, help="Add this many generated item names")
+    parser.add_argument("--workers", type=int, default=None, help="Tracing processes")
+    parser.add_argument("--mode", default="outline", choices=["outline", "centerline"])
+    options = parser.parse_args()
+
+    items = options.items + [f"item {i}" for i in range(options.count)]
+    if options.stub:
+        generate_image = partial(stub_image, latency=options.stub_latency)
+    else:
+        generate_image = diffusion_image
+
+    start = time.perf_counter()
+    latencies = []
+    for result in vectorize_batch(items, generate_image=generate_image, max_workers=options.workers,
+                                  include_svg=False, mode=options.mode):
+        latencies.append(result["seconds"])
+        status = result.get("error") or f"{len(result['gcode'])} lines"
+        print(f"{result['seconds']:7.2f}s  {result['item']}: {status}")
+
+    elapsed = time.perf_counter() - start
+    if latencies:
+        print(
+            f"{len(latencies)} images in {elapsed:.2f}s, {len(latencies) / elapsed:.2f} images/s, "
+            f"p50 {np.percentile(latencies, 50):.2f}s, p95 {np.percentile(latencies, 95):.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
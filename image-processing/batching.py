@@ -0,0 +1,119 @@
+# Micro-batching of concurrent calls into one batched call.
+#
+# Callers submit requests from their own threads. A single worker thread waits up to `window`
+# seconds after the first pending request for more requests with the same key, then runs up to
+# `max_batch_size` of them in one call and hands every caller its own result. A request can count
+# for more than one (e.g. the number of images it asks for), a request larger than the maximum
+# runs on its own.
+import threading
+import time
+from concurrent.futures import Future
+
+
+class _Request:
+    __slots__ = ("value", "key", "size", "future", "arrival")
+
+    def __init__(self, value, key, size):
+        self.value = value
+        self.key = key
+        self.size = size
+        self.future = Future()
+        self.arrival = time.perf_counter()
+
+
+class MicroBatcher:
+    """
+    Runs requests submitted together as one call of run_batch(values) -> results, in the same order.
+    Only requests with equal keys are batched together.
+    """
+
+    def __init__(self, run_batch, max_batch_size=4, window=0.05):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.window = window
+
+        self._condition = threading.Condition()
+        self._pending = []
+        self._closed = False
+        self._stats = {"requests": 0, "batches": 0, "largest_batch": 0}
+
+        self._worker = threading.Thread(target=self._work, daemon=True)
+        self._worker.start()
+
+    def submit(self, value, key=None, size=1):
+        request = _Request(value, key, size)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed")
+            self._pending.append(request)
+            self._condition.notify()
+        return request.future
+
+    def __call__(self, value, key=None, size=1):
+        return self.submit(value, key, size).result()
+
+    def close(self):
+        # Runs what is pending, then stops the worker
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._worker.join()
+
+    def _next_batch(self):
+        with self._condition:
+            while not self._pending and not self._closed:
+                self._condition.wait()
+            if not self._pending:
+                return None
+
+            # The oldest request decides the key and the deadline of the batch
+            first = self._pending[0]
+            deadline = first.arrival + self.window
+            while True:
+                batch, total, full = [], 0, False
+                for request in self._pending:
+                    if request.key != first.key:
+                        continue
+                    if batch and total + request.size > self.max_batch_size:
+                        full = True
+                        continue
+                    batch.append(request)
+                    total += request.size
+                remaining = deadline - time.perf_counter()
+                if full or total >= self.max_batch_size or remaining <= 0 or self._closed:
+                    break
+                self._condition.wait(remaining)
+
+            self._pending = [request for request in self._pending if request not in batch]
+            return batch
+
+    def _work(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            try:
+                results = self.run_batch([request.value for request in batch])
+                if len(results) != len(batch):
+                    raise ValueError(f"run_batch returned {len(results)} results for {len(batch)} requests")
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+            else:
+                for request, result in zip(batch, results):
+                    request.future.set_result(result)
+
+            with self._condition:
+                self._stats["requests"] += len(batch)
+                self._stats["batches"] += 1
+                self._stats["largest_batch"] = max(self._stats["largest_batch"], len(batch))
+
+    def stats(self):
+        with self._condition:
+            batches = self._stats["batches"]
+            return {
+                **self._stats,
+                "pending": len(self._pending),
+                "mean_batch": self._stats["requests"] / batches if batches else 0.0,
+            }
@@ -0,0 +1,71 @@
+# Benchmarks micro-batching of diffusion requests with stub pipelines on CPU.
+#
+#   python benchmark_batching.py
+#
+# Requests arrive as a Poisson process and go through a MicroBatcher in front of
+# generate_images from diffusion.py, with StubPipeline standing in for the base and refiner.
+# Reports latency percentiles, throughput and the mean batch size for each batching window.
+# A window of 0 with a batch size of 1 is the current one-request-per-pass behaviour.
+import threading
+import time
+
+import numpy as np
+
+from batching import MicroBatcher
+from diffusion import generate_images
+from stub_pipeline import StubPipeline
+
+REQUESTS = 32
+ARRIVAL_RATES = [2.0, 12.0]  # requests per second, below and above what unbatched calls sustain
+MAX_BATCH_SIZE = 4
+WINDOWS = [0.0, 0.02, 0.05, 0.1, 0.25]
+
+
+def run(arrival_rate, window, max_batch_size, seed=0):
+    base, refiner = StubPipeline(), StubPipeline()
+    batcher = MicroBatcher(
+        lambda items: generate_images(base, refiner, items, n_steps=24, high_noise_frac=0.8),
+        max_batch_size=max_batch_size,
+        window=window,
+    )
+
+    latencies = [None] * REQUESTS
+    start = time.perf_counter()
+
+    def request(index):
+        submitted = time.perf_counter()
+        batcher(f"item {index}", key=(24, 0.8))
+        latencies[index] = time.perf_counter() - submitted
+
+    threads = []
+    arrivals = np.cumsum(np.random.default_rng(seed).exponential(1 / arrival_rate, REQUESTS))
+    for index, arrival in enumerate(arrivals):
+        time.sleep(max(0.0, start + arrival - time.perf_counter()))
+        thread = threading.Thread(target=request, args=(index,))
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.perf_counter() - start
+    stats = batcher.stats()
+    batcher.close()
+    return latencies, elapsed, stats
+
+
+def main():
+    print(f"{'rate':>6} {'window':>7} {'batch':>6} {'p50':>8} {'p95':>8} {'images/s':>9} {'mean batch':>11}")
+
+    for arrival_rate in ARRIVAL_RATES:
+        for window in WINDOWS:
+            max_batch_size = 1 if window == 0 else MAX_BATCH_SIZE
+            latencies, elapsed, stats = run(arrival_rate, window, max_batch_size)
+            print(
+                f"{arrival_rate:4.0f}/s {window * 1000:5.0f}ms {max_batch_size:>6} "
+                f"{np.percentile(latencies, 50):7.2f}s {np.percentile(latencies, 95):7.2f}s "
+                f"{REQUESTS / elapsed:9.2f} {stats['mean_batch']:11.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
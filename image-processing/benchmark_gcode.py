@@ -0,0 +1,79 @@
+# Benchmarks G-code emission on drawings made of thousands of strokes.
+#
+#   python benchmark_gcode.py
+#
+# Compares the original emitter (all travel moves first, one f-string per point) with
+# gcode_chunks from the engine, both as a list of lines and streamed to a file.
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from engine import gcode_chunks
+
+STROKE_COUNTS = [1_000, 5_000, 20_000]
+POINTS_PER_STROKE = 40
+
+
+def original_gcode(paths):
+    # Original emitter from Model.svg_to_gcode, kept here as the baseline.
+    gcode = []
+
+    matrix_of_coords = []  # code, x, y, z
+
+    for simplified_points in paths:
+        start_point = simplified_points[0]
+        gcode.append(f"G00 X{start_point[0]:.3f} Y{start_point[1]:.3f} Z0.5")  # Lift pen and move to start
+
+        for point in simplified_points:
+            x, y = point
+            matrix_of_coords.append(['G01', x, y, 0])
+
+    for coord in matrix_of_coords:
+        gcode.append(f"{coord[0]} X{coord[1]:.3f} Y{coord[2]:.3f} Z-0.500")
+
+    gcode.append("G00 Z0.5")
+
+    return gcode
+
+
+def make_strokes(count, seed=0):
+    # Short random walks scattered over a 1024x1024 canvas.
+    rng = np.random.default_rng(seed)
+    starts = rng.uniform(0, 1024, size=(count, 1, 2))
+    steps = rng.normal(scale=3.0, size=(count, POINTS_PER_STROKE, 2))
+    return list(starts + np.cumsum(steps, axis=1))
+
+
+def stream_to_file(paths):
+    with tempfile.NamedTemporaryFile("w", suffix=".gcode", delete=False) as f:
+        f.writelines(gcode_chunks(paths))
+    size = os.path.getsize(f.name)
+    os.remove(f.name)
+    return size
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    print(f"{'strokes':>8} {'points':>9} {'original':>11} {'chunks':>11} {'streamed':>11}")
+
+    for count in STROKE_COUNTS:
+        paths = make_strokes(count)
+        original = timed(original_gcode, paths)
+        chunks = timed(lambda p: "".join(gcode_chunks(p)).splitlines(), paths)
+        streamed = timed(stream_to_file, paths)
+
+        print(
+            f"{count:>8} {count * POINTS_PER_STROKE:>9} "
+            f"{original:9.1f}ms {chunks:9.1f}ms {streamed:9.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# Benchmarks handing generated images from diffusion to the vectorizer as JPEG, PNG or raw pixels.
+#
+#   python benchmark_handoff.py
+#
+# Images come from generate_images in diffusion.py with StubPipeline on CPU. Each one is encoded with
+# encode_image from diffusion.py and traced with the engine. Reports the payload size, encode +
+# trace time and the traced strokes, points and estimated drawing time, averaged over the items.
+# JPEG ringing around the outlines shows up as extra contours compared to the lossless formats.
+import pickle
+import time
+
+import numpy as np
+
+from diffusion import encode_image, generate_images
+from engine import estimate_drawing_time, trace_paths
+from stub_pipeline import StubPipeline
+
+ITEMS = ["apple", "house", "cat", "star", "tree", "car", "boat", "dog"]
+FORMATS = ["jpeg", "png", "array"]
+
+
+def handed_off(image, format):
+    # What the vectorizer receives: encoded bytes, or the array itself
+    payload = encode_image(image, format)
+    return payload if format == "array" else payload.getvalue()
+
+
+def main():
+    stub = StubPipeline(setup=0.0, per_image_step=0.0)
+    images = generate_images(stub, stub, ITEMS)
+
+    print(f"{'format':>7} {'payload':>9} {'pickled':>9} {'time':>9} {'strokes':>8} {'points':>7} {'drawing':>8}")
+    for format in FORMATS:
+        rows = []
+        for image in images:
+            start = time.perf_counter()
+            payload = handed_off(image, format)
+            traced = trace_paths(payload)
+            elapsed = time.perf_counter() - start
+
+            estimate = estimate_drawing_time(traced["paths"], traced["size"])
+            size = payload.nbytes if format == "array" else len(payload)
+            rows.append((size, len(pickle.dumps(payload)), elapsed * 1000, estimate["strokes"],
+                         estimate["points"], estimate["seconds"]))
+
+        size, pickled, elapsed, strokes, points, seconds = np.mean(rows, axis=0)
+        print(
+            f"{format:>7} {size / 1024:8.0f}K {pickled / 1024:8.0f}K {elapsed:7.1f}ms "
+            f"{strokes:8.1f} {points:7.0f} {seconds:7.0f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
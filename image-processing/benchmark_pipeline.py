@@ -0,0 +1,185 @@
+# Benchmarks every stage of the image -> SVG -> G-code pipeline on synthetic line art.
+#
+#   python benchmark_pipeline.py                      # writes benchmark-<commit>.json
+#   python benchmark_pipeline.py --compare old.json   # also prints the change against an earlier run
+#
+# Images are circles, polygons, text and noisy icons drawn with OpenCV at several resolutions, so
+# the run is deterministic and needs neither the Modal deployments nor a GPU. Times are the
+# median of --repeats runs. Point and stroke counts and the pen-down length (in image pixels)
+# are recorded alongside, so a faster stage that draws something else shows up too.
+import argparse
+import io
+import json
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import cv2
+import numpy as np
+import svgpathtools
+from PIL import Image
+
+from engine import image_to_svg, points_to_gcode, simplify_path, svg_to_gcode, trace_image
+
+RESOLUTIONS = [512, 1024, 2048]
+STAGES = ["image_to_svg", "simplify_path", "points_to_gcode", "svg_to_gcode", "trace_image"]
+
+
+def circles(size, rng):
+    image = np.full((size, size), 255, np.uint8)
+    for _ in range(6):
+        center = tuple(int(v) for v in rng.integers(size // 5, 4 * size // 5, 2))
+        cv2.circle(image, center, int(rng.integers(size // 20, size // 4)), 0, max(size // 128, 2))
+    return image
+
+
+def polygons(size, rng):
+    image = np.full((size, size), 255, np.uint8)
+    for _ in range(5):
+        polygon = rng.integers(size // 10, 9 * size // 10, (int(rng.integers(3, 8)), 2)).astype(np.int32)
+        cv2.polylines(image, [polygon], True, 0, max(size // 128, 2))
+    return image
+
+
+def text(size, rng):
+    image = np.full((size, size), 255, np.uint8)
+    scale = size / 256
+    for row, word in enumerate(["SPOT", "DRAWS", "G-CODE"]):
+        cv2.putText(image, word, (size // 16, (row + 1) * size // 4), cv2.FONT_HERSHEY_SIMPLEX,
+                    scale, 0, max(int(2 * scale), 1))
+    return image
+
+
+def noisy_icon(size, rng):
+    # Wobbly strokes and paper noise, closer to what the diffusion model produces
+    image = np.full((size, size), 255, np.uint8)
+    for _ in range(8):
+        theta = np.linspace(0, 2 * np.pi, 200)
+        radius = rng.uniform(size / 16, size / 4) * (1 + 0.1 * np.sin(theta * rng.integers(3, 9)))
+        center = rng.uniform(size / 4, 3 * size / 4, 2)
+        points = center + np.column_stack((radius * np.cos(theta), radius * np.sin(theta)))
+        points += rng.normal(scale=size / 512, size=points.shape)
+        cv2.polylines(image, [points.astype(np.int32)], False, 0, max(size // 170, 2))
+    noise = rng.normal(scale=12, size=image.shape)
+    return np.clip(image + noise, 0, 255).astype(np.uint8)
+
+
+GENERATORS = {"circles": circles, "polygons": polygons, "text": text, "noisy_icon": noisy_icon}
+
+
+def make_image(kind, size, seed=0):
+    gray = GENERATORS[kind](size, np.random.default_rng(seed))
+    return Image.fromarray(cv2.cvtColor(gray, cv2.COLOR_GRAY2RGB))
+
+
+def jpeg_bytes(image):
+    stream = io.BytesIO()
+    image.save(stream, format="JPEG")
+    return stream.getvalue()
+
+
+def measure(function, repeats):
+    # Median time in milliseconds and the result of the last run
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times)), result
+
+
+def pen_down_length(paths):
+    return float(sum(np.hypot(*np.diff(points, axis=0).T).sum() for points in paths if len(points) > 1))
+
+
+def run_case(kind, size, repeats):
+    image = make_image(kind, size)
+    image_bytes = jpeg_bytes(image)
+    times = {}
+
+    times["image_to_svg"], svg_stream = measure(lambda: image_to_svg(image), repeats)
+    svg_data = svg_stream.getvalue()
+    svg_paths, _ = svgpathtools.svg2paths(io.BytesIO(svg_data))
+
+    times["simplify_path"], paths = measure(lambda: [simplify_path(path, float(90)) for path in svg_paths], repeats)
+    times["points_to_gcode"], gcode = measure(lambda: points_to_gcode(paths), repeats)
+    times["svg_to_gcode"], _ = measure(lambda: svg_to_gcode(svg_data), repeats)
+    times["trace_image"], _ = measure(lambda: trace_image(image_bytes, include_svg=False), repeats)
+
+    return {
+        "image": kind,
+        "size": size,
+        "ms": times,
+        "strokes": len(paths),
+        "contour_points": sum(len(path) + 1 for path in svg_paths),
+        "points": sum(len(points) for points in paths),
+        "pen_down_length": round(pen_down_length(paths), 3),
+        "gcode_lines": len(gcode),
+        "svg_bytes": len(svg_data),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results, baseline):
+    # Prints the relative change of every stage time and count against an earlier run
+    previous = {(case["image"], case["size"]): case for case in baseline["cases"]}
+    print(f"\nChange against {baseline['commit']}:")
+    for case in results["cases"]:
+        old = previous.get((case["image"], case["size"]))
+        if old is None:
+            continue
+        changes = [f"{stage} {case['ms'][stage] / old['ms'][stage] - 1:+.0%}"
+                   for stage in STAGES if old["ms"].get(stage)]
+        changes += [f"{name} {old[name]}->{case[name]}"
+                    for name in ("strokes", "points", "gcode_lines") if old[name] != case[name]]
+        print(f"{case['image']:>12} {case['size']:>5}  " + ", ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=RESOLUTIONS, help="Image resolutions")
+    parser.add_argument("--images", nargs="+", default=list(GENERATORS), choices=list(GENERATORS))
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per stage, the median is kept")
+    parser.add_argument("--output", help="JSON file to write, defaults to benchmark-<commit>.json")
+    parser.add_argument("--compare", help="Earlier JSON result to compare with")
+    options = parser.parse_args()
+
+    results = {
+        "commit": git_commit(),
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "repeats": options.repeats,
+        "cases": [],
+    }
+
+    print(f"{'image':>12} {'size':>5} " + " ".join(f"{stage:>15}" for stage in STAGES) +
+          f" {'strokes':>8} {'points':>7} {'length':>9}")
+    for kind in options.images:
+        for size in options.sizes:
+            case = run_case(kind, size, options.repeats)
+            results["cases"].append(case)
+            print(f"{kind:>12} {size:>5} " + " ".join(f"{case['ms'][stage]:13.1f}ms" for stage in STAGES) +
+                  f" {case['strokes']:>8} {case['points']:>7} {case['pen_down_length']:9.0f}")
+
+    output = options.output or f"benchmark-{results['commit']}.json"
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nWrote {output}")
+
+    if options.compare:
+        with open(options.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
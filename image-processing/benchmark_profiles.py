@@ -0,0 +1,57 @@
+# Benchmarks the draft and final generation profiles with stub pipelines on CPU.
+#
+#   python benchmark_profiles.py
+#
+# Generates every item with generate_images from diffusion.py under each profile in PROFILES,
+# StubPipeline standing in for the base and refiner, then traces the image. Reports the generation
+# latency, the image size and what the drawing costs the robot: strokes, points and the estimated
+# drawing time. The stub latency follows steps, pixels and the refiner pass, not real model quality.
+import time
+
+import numpy as np
+
+from diffusion import PROFILES, generate_images, profile_params
+from engine import estimate_drawing_time, trace_paths
+from stub_pipeline import StubPipeline
+
+ITEMS = ["apple", "house", "cat", "star"]
+
+
+def run(profile, item):
+    base, refiner = StubPipeline(), StubPipeline()
+    params = profile_params(profile)
+    del params["profile"]
+
+    start = time.perf_counter()
+    image = generate_images(base, refiner, [item], **params)[0]
+    latency = time.perf_counter() - start
+
+    traced = trace_paths(np.asarray(image))
+    return {
+        "latency": latency,
+        "size": image.size,
+        "strokes": len(traced["paths"]),
+        "points": sum(len(points) for points in traced["paths"]),
+        "seconds": estimate_drawing_time(traced["paths"], traced["size"])["seconds"],
+    }
+
+
+def main():
+    print(f"{'profile':>8} {'item':>8} {'latency':>8} {'size':>10} {'strokes':>8} {'points':>7} {'drawing':>8}")
+
+    for profile in PROFILES:
+        results = [run(profile, item) for item in ITEMS]
+        for item, result in zip(ITEMS, results):
+            width, height = result["size"]
+            print(
+                f"{profile:>8} {item:>8} {result['latency']:7.2f}s {f'{width}x{height}':>10} "
+                f"{result['strokes']:>8} {result['points']:>7} {result['seconds']:7.1f}s"
+            )
+        print(f"{profile:>8} {'mean':>8} {np.mean([result['latency'] for result in results]):7.2f}s {'':>10} "
+              f"{np.mean([result['strokes'] for result in results]):8.1f} "
+              f"{np.mean([result['points'] for result in results]):7.0f} "
+              f"{np.mean([result['seconds'] for result in results]):7.1f}s")
+
+
+if __name__ == "__main__":
+    main()
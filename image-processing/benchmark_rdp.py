@@ -0,0 +1,86 @@
+# Benchmarks the Ramer-Douglas-Peucker implementations used by the vectorizer.
+#
+#   python benchmark_rdp.py
+#
+# Compares the original recursive version, the iterative vectorized one in engine/simplify.py
+# and cv2.approxPolyDP on synthetic noisy contours of 10^3 to 10^6 points.
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from engine import ramer_douglas_peucker
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+EPSILON = 1.5
+# The recursive version is quadratic in allocations and hits the recursion limit on long contours.
+RECURSIVE_MAX_POINTS = 10_000
+
+
+def recursive_ramer_douglas_peucker(points, epsilon):
+    # Original implementation, kept here as the baseline.
+    if len(points) < 3:
+        return points
+
+    def point_line_distance(point, start, end):
+        if np.array_equal(start, end):
+            return np.linalg.norm(np.array(point) - np.array(start))
+        else:
+            return np.abs(np.cross(end - start, start - point)) / np.linalg.norm(end - start)
+
+    start, end = np.array(points[0]), np.array(points[-1])
+    distances = [point_line_distance(np.array(point), start, end) for point in points[1:-1]]
+    max_distance = max(distances)
+
+    if max_distance > epsilon:
+        index = distances.index(max_distance) + 1
+        return recursive_ramer_douglas_peucker(points[:index + 1], epsilon)[:-1] + recursive_ramer_douglas_peucker(points[index:], epsilon)
+    else:
+        return [points[0], points[-1]]
+
+
+def make_contour(n_points, seed=0):
+    # Noisy open spiral, scaled so neighbouring points are about one pixel apart.
+    rng = np.random.default_rng(seed)
+    theta = np.linspace(0, 8 * np.pi, n_points)
+    radius = n_points / (8 * np.pi) * (0.5 + theta / (16 * np.pi))
+    points = np.column_stack((radius * np.cos(theta), radius * np.sin(theta)))
+    return points + rng.normal(scale=0.5, size=points.shape)
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, len(result)
+
+
+def main():
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 4 * RECURSIVE_MAX_POINTS))
+    print(f"{'points':>10} {'recursive':>14} {'iterative':>14} {'approxPolyDP':>14}")
+
+    for size in SIZES:
+        points = make_contour(size)
+
+        if size <= RECURSIVE_MAX_POINTS:
+            recursive_time, recursive_count = timed(
+                recursive_ramer_douglas_peucker, [tuple(point) for point in points], EPSILON
+            )
+            recursive = f"{recursive_time * 1000:8.1f}ms/{recursive_count}"
+        else:
+            recursive = "skipped"
+
+        iterative_time, iterative_count = timed(ramer_douglas_peucker, points, EPSILON)
+        opencv_time, opencv_count = timed(
+            cv2.approxPolyDP, points.astype(np.float32).reshape(-1, 1, 2), EPSILON, False
+        )
+
+        print(
+            f"{size:>10} {recursive:>14} "
+            f"{iterative_time * 1000:8.1f}ms/{iterative_count:<5} "
+            f"{opencv_time * 1000:8.1f}ms/{opencv_count}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# Benchmarks edge detection at reduced working resolutions against the full resolution result.
+#
+#   python benchmark_resolution.py
+#
+# For each working size, reports the time of contour extraction plus simplification and how far
+# the simplified paths deviate from the full resolution ones (mean and max distance in image
+# pixels, measured both ways so missing and extra strokes both count).
+import time
+from io import BytesIO
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from batch import stub_image
+from engine import contours_to_paths, detect_contours
+
+IMAGE_SIZES = [1024, 2048]
+WORKING_SIZES = [None, 1024, 768, 512, 384, 256]
+ITEMS = ["apple", "house", "cat", "star"]
+REPEATS = 3
+
+
+def rasterize(paths, size):
+    canvas = np.zeros((size[1], size[0]), np.uint8)
+    polylines = [np.rint(points).astype(np.int32) for points in paths]
+    cv2.polylines(canvas, polylines, False, 255, 1)
+    return canvas
+
+
+def sample(paths, step=1.0):
+    # Points every `step` pixels along every path
+    samples = []
+    for points in paths:
+        for start, end in zip(points[:-1], points[1:]):
+            count = max(int(np.hypot(*(end - start)) / step), 1)
+            samples.append(start + (end - start) * np.linspace(0, 1, count, endpoint=False)[:, None])
+        samples.append(points[-1:])
+    return np.concatenate(samples) if samples else np.zeros((0, 2))
+
+
+def distances(paths, reference, size):
+    # Distance from points along `paths` to the nearest pixel of `reference`
+    distance_map = cv2.distanceTransform(255 - rasterize(reference, size), cv2.DIST_L2, 5)
+    points = np.clip(np.rint(sample(paths)).astype(np.int64), 0, [distance_map.shape[1] - 1, distance_map.shape[0] - 1])
+    return distance_map[points[:, 1], points[:, 0]]
+
+
+def run(image, working_size, refine):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        paths = contours_to_paths(detect_contours(image, working_size=working_size, refine=refine))
+    return (time.perf_counter() - start) / REPEATS * 1000, paths
+
+
+def main():
+    print(f"{'image':>6} {'working':>8} {'refine':>7} {'time':>9} {'mean dev':>9} {'max dev':>8}")
+
+    for image_size in IMAGE_SIZES:
+        images = [Image.open(BytesIO(stub_image(item, size=image_size))) for item in ITEMS]
+        references = [run(image, None, False) for image in images]
+
+        for working_size in WORKING_SIZES:
+            for refine in ([False] if working_size is None else [False, True]):
+                times, deviations = [], []
+                for image, (_, reference) in zip(images, references):
+                    elapsed, paths = run(image, working_size, refine)
+                    canvas = image.size
+                    times.append(elapsed)
+                    deviations.append(np.concatenate((
+                        distances(paths, reference, canvas),
+                        distances(reference, paths, canvas),
+                    )))
+
+                deviation = np.concatenate(deviations)
+                print(
+                    f"{image_size:>6} {str(working_size or 'full'):>8} {str(refine):>7} "
+                    f"{np.mean(times):7.1f}ms {deviation.mean():9.2f} {deviation.max():8.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
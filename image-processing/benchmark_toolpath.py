@@ -0,0 +1,68 @@
+# Benchmarks the binary toolpath format against G-code text.
+#
+#   python benchmark_toolpath.py
+#
+# For traced stub drawings and large random drawings, compares payload size (raw and gzipped)
+# and decode time: parsing the text the way resize_gcode_string does versus toolpath.decode.
+import gzip
+import time
+
+from batch import stub_image
+from benchmark_gcode import make_strokes
+from engine import points_to_gcode, trace_image
+from toolpath import decode, gcode_to_toolpath
+
+ITEMS = ["apple", "house", "cat", "star"]
+STROKE_COUNTS = [1_000, 5_000]
+REPEATS = 5
+
+
+def parse_text(gcode_string):
+    # Same split() / float() work as resize_gcode_string and GCodeReader
+    points = []
+    for line in gcode_string.split("\n"):
+        if line.startswith("G1") or line.startswith("G0"):
+            x = y = None
+            for part in line.split():
+                if part.startswith("X"):
+                    x = float(part[1:])
+                elif part.startswith("Y"):
+                    y = float(part[1:])
+            points.append((x, y))
+    return points
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        function(*args)
+    return (time.perf_counter() - start) / REPEATS * 1000
+
+
+def report(name, gcode):
+    text = "\n".join(gcode).encode("utf-8")
+    binary = gcode_to_toolpath(gcode)
+
+    print(
+        f"{name:>14} {len(gcode):>7} "
+        f"{len(text) / 1024:8.1f}K {len(gzip.compress(text)) / 1024:8.1f}K "
+        f"{len(binary) / 1024:8.1f}K {len(gzip.compress(binary)) / 1024:8.1f}K "
+        f"{timed(parse_text, text.decode('utf-8')):8.2f}ms {timed(decode, binary):8.2f}ms"
+    )
+
+
+def main():
+    print(
+        f"{'drawing':>14} {'lines':>7} {'text':>9} {'text.gz':>9} {'binary':>9} {'binary.gz':>9} "
+        f"{'parse':>10} {'decode':>10}"
+    )
+
+    for item in ITEMS:
+        report(item, trace_image(stub_image(item), include_svg=False)["gcode"])
+
+    for count in STROKE_COUNTS:
+        report(f"{count} strokes", points_to_gcode(make_strokes(count)))
+
+
+if __name__ == "__main__":
+    main()
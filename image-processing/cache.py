@@ -0,0 +1,144 @@
+# Content-addressed cache for item -> image -> G-code results.
+#
+# Entries are keyed on the canonicalized item plus every generation and vectorization
+# parameter, kept in a small in-memory LRU and in a size-bounded LRU directory on disk.
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+
+def canonical_item(item):
+    # "  An Apple " and "an apple" are the same drawing.
+    return re.sub(r"\s+", " ", item).strip().lower()
+
+
+def _digest(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def item_prefix(item):
+    return _digest(canonical_item(item))[:16]
+
+
+def cache_key(item, **params):
+    # Keys start with a digest of the item alone so every variant of an item can be invalidated.
+    return f"{item_prefix(item)}-{_digest({'item': canonical_item(item), **params})}"
+
+
+class ResultCache:
+    """
+    Two tier LRU cache of JSON-serializable results.
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024, memory_items=64):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        # Disk index in least to most recently used order, rebuilt from file access times
+        os.makedirs(directory, exist_ok=True)
+        entries = []
+        for name in os.listdir(directory):
+            if name.endswith(".json"):
+                stat = os.stat(os.path.join(directory, name))
+                entries.append((stat.st_mtime, name[:-5], stat.st_size))
+        self._disk = OrderedDict((key, size) for _, key, size in sorted(entries))
+        self._disk_bytes = sum(self._disk.values())
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._disk.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return self._memory[key]
+
+            if key in self._disk:
+                try:
+                    with open(self._path(key), "r") as f:
+                        value = json.load(f)
+                    os.utime(self._path(key))
+                except (OSError, ValueError):
+                    self._forget(key)
+                else:
+                    self._disk.move_to_end(key)
+                    self._remember(key, value)
+                    self._stats["disk_hits"] += 1
+                    return value
+
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, key, value):
+        data = json.dumps(value).encode("utf-8")
+
+        with self._lock:
+            self._forget(key)
+
+            # Write then rename so readers never see a partial entry
+            temp_path = f"{self._path(key)}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, self._path(key))
+
+            self._disk[key] = len(data)
+            self._disk_bytes += len(data)
+            self._remember(key, value)
+
+            while self._disk_bytes > self.max_bytes and len(self._disk) > 1:
+                oldest = next(iter(self._disk))
+                self._forget(oldest)
+                self._stats["evictions"] += 1
+
+    def _forget(self, key):
+        self._memory.pop(key, None)
+        size = self._disk.pop(key, None)
+        if size is not None:
+            self._disk_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def invalidate(self, key=None, item=None):
+        # Removes one entry, every entry of an item, or everything when neither is given.
+        with self._lock:
+            if key is not None:
+                keys = [key] if key in self._disk else []
+            elif item is not None:
+                keys = [k for k in self._disk if k.startswith(f"{item_prefix(item)}-")]
+            else:
+                keys = list(self._disk)
+
+            for k in keys:
+                self._forget(k)
+            return len(keys)
+
+    def stats(self):
+        with self._lock:
+            lookups = sum(self._stats.values()) - self._stats["evictions"]
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            return {
+                **self._stats,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "entries": len(self._disk),
+                "memory_entries": len(self._memory),
+                "bytes": self._disk_bytes,
+                "max_bytes": self.max_bytes,
+            }
@@ -1,3 +1,6 @@
+import logging
+import os
+import random
 from io import BytesIO
 
 from modal import (
@@ -27,11 +30,91 @@ app = App(
     "stable-diffusion-xl"
 )
 
+logger = logging.getLogger(__name__)
+
+# Concurrent inference calls within BATCH_WINDOW seconds share one batched pipeline call of up to
+# MAX_BATCH_SIZE images
+MAX_BATCH_SIZE = int(os.getenv("DIFFUSION_MAX_BATCH_SIZE", 4))
+BATCH_WINDOW = float(os.getenv("DIFFUSION_BATCH_WINDOW", 0.1))
+
+# Named generation settings, selectable per request. high_noise_frac is where the base hands over to the refiner.
+PROFILES = {
+    # Quick look: base model only, fewer steps, at a lower resolution
+    "draft": {"width": 768, "height": 768, "n_steps": 12, "high_noise_frac": 1.0, "use_refiner": False},
+    # Base + refiner at SDXL's native resolution
+    "final": {"width": 1024, "height": 1024, "n_steps": 24, "high_noise_frac": 0.8, "use_refiner": True},
+}
+
+NEGATIVE_PROMPT = "deformed, uncentered, detailed, complex, patterned, textured background, colorful, noisy"
+
 with sdxl_image.imports():
+    import numpy as np
     import torch
     from diffusers import DiffusionPipeline
     from PIL import Image
-@app.cls(gpu=gpu.A10G(),image=sdxl_image, container_idle_timeout=1200) #container_idle_timeout=240, 
+
+    from batching import MicroBatcher
+
+def prompt_for(item):
+    return f'simple icon representing an outline of a {item} on a white background'
+
+def new_seeds(count):
+    return [random.randrange(2 ** 32) for _ in range(count)]
+
+def profile_params(profile="final", **overrides):
+    # Generation parameters of a profile, with the overrides that are not None
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown profile {profile}, expected one of {', '.join(PROFILES)}")
+    return dict(PROFILES[profile], profile=profile,
+                **{name: value for name, value in overrides.items() if value is not None})
+
+def generate_images(base, refiner, items, n_steps=35, high_noise_frac=0.9, num_images_per_prompt=1, generator=None,
+                    width=1024, height=1024, use_refiner=True):
+    # One batched base + refiner pass for every item. Returns num_images_per_prompt PIL images per
+    # item, grouped by item. generator is one torch.Generator per image, in the same order.
+    prompts = [prompt_for(item) for item in items]
+    negative_prompts = [NEGATIVE_PROMPT] * len(items)
+
+    base_options = dict(
+        guidance_scale=20,
+        prompt=prompts,
+        negative_prompt=negative_prompts,
+        num_inference_steps=n_steps,
+        num_images_per_prompt=num_images_per_prompt,
+        generator=generator,
+        width=width,
+        height=height,
+    )
+    if not use_refiner:
+        return base(**base_options).images
+
+    latents = base(
+        **base_options,
+        denoising_end=high_noise_frac,
+        output_type="latent",
+    ).images
+    return refiner(
+        prompt=prompts,
+        negative_prompt=negative_prompts,
+        num_inference_steps=n_steps,
+        denoising_start=high_noise_frac,
+        num_images_per_prompt=num_images_per_prompt,
+        generator=generator,
+        image=latents,
+    ).images
+
+def encode_image(image, format="jpeg"):
+    # "jpeg" and "png" give a BytesIO, "array" the uint8 RGB pixels as they come out of the refiner.
+    # PNG and arrays are lossless, JPEG ringing around the outlines shows up as extra edges.
+    if format == "array":
+        return np.asarray(image.convert("RGB"))
+
+    img_byte_stream = BytesIO()
+    image.save(img_byte_stream, format=format.upper())
+
+    return img_byte_stream
+
+@app.cls(gpu=gpu.A10G(),image=sdxl_image, container_idle_timeout=1200, allow_concurrent_inputs=2 * MAX_BATCH_SIZE) #container_idle_timeout=240, 
 class Model:
     @build()
     def build(self):
@@ -70,33 +153,62 @@ class Model:
             **load_options,
         )
 
+        self.batcher = MicroBatcher(self._run_batch, max_batch_size=MAX_BATCH_SIZE, window=BATCH_WINDOW)
+
+    def _generators(self, seeds):
+        return [torch.Generator(device="cuda").manual_seed(seed) for seed in seeds]
+
+    def _inference_batch(self, items, seeds, formats, params):
+        # seeds holds the candidate seeds of every item, the same number for each item, and formats
+        # the encoding of every item. params are profile_params. Returns a list of
+        # {"seed", "image", "generation"} candidates per item.
+        count = len(seeds[0])
+        images = generate_images(
+            self.base, self.refiner, items,
+            num_images_per_prompt=count,
+            generator=self._generators([seed for item_seeds in seeds for seed in item_seeds]),
+            **{name: value for name, value in params.items() if name != "profile"},
+        )
+
+        logger.debug("Generated %d images for %d items", len(images), len(items))
+
+        return [
+            [{"seed": seed, "image": encode_image(image, format), "generation": params}
+             for seed, image in zip(item_seeds, images[i * count:])]
+            for i, (item_seeds, format) in enumerate(zip(seeds, formats))
+        ]
+
     def _inference(self, item, n_steps=35, high_noise_frac=0.9):
-        negative_prompt = "deformed, uncentered, detailed, complex, patterned, textured background, colorful, noisy"
-        prompt_template = f'simple icon representing an outline of a {item} on a white background'
-
-        image = self.base(
-            guidance_scale=20,
-            prompt=prompt_template,
-            negative_prompt=negative_prompt,
-            num_inference_steps=n_steps,
-            denoising_end=high_noise_frac,
-            output_type="latent",
-        ).images
-        image = self.refiner(
-            prompt=prompt_template,
-            negative_prompt=negative_prompt,
-            num_inference_steps=n_steps,
-            denoising_start=high_noise_frac,
-            image=image,
-        ).images[0]
-
-        print("Image shape:", image)
-
-        img_byte_stream = BytesIO()
-        image.save(img_byte_stream, format="JPEG")
-
-        return img_byte_stream
+        params = profile_params("final", n_steps=n_steps, high_noise_frac=high_noise_frac)
+        return self._inference_batch([item], [new_seeds(1)], ["jpeg"], params)[0][0]["image"]
+
+    def _run_batch(self, requests):
+        # requests are (item, seeds, format, params), batched by candidate count and generation parameters
+        params = requests[0][3]
+        return self._inference_batch([item for item, *_ in requests], [seeds for _, seeds, *_ in requests],
+                                     [format for _, _, format, _ in requests], params)
 
     @method()
-    def inference(self, item, n_steps=24, high_noise_frac=0.8):
-        return self._inference(item, n_steps=n_steps, high_noise_frac=high_noise_frac)
\ No newline at end of file
+    def inference(self, item, n_steps=None, high_noise_frac=None, candidates=None, seeds=None, format="jpeg",
+                  profile="final"):
+        # Without candidates or seeds, returns one image like before. Otherwise returns a list of
+        # {"seed", "image", "generation"} candidates, all from one pipeline pass. Passing a candidate's
+        # seed again regenerates the same image. format is "jpeg", "png" or "array", see encode_image.
+        # n_steps and high_noise_frac override the profile's.
+        params = profile_params(profile, n_steps=n_steps, high_noise_frac=high_noise_frac)
+
+        if seeds is None:
+            generated = new_seeds(candidates or 1)
+        elif candidates is not None and candidates != len(seeds):
+            raise ValueError(f"Got {len(seeds)} seeds for {candidates} candidates")
+        else:
+            generated = list(seeds)
+
+        # Batches are limited in 1024x1024 image equivalents
+        size = len(generated) * params["width"] * params["height"] / 1024 ** 2
+        results = self.batcher((item, generated, format, params),
+                               key=(len(generated), tuple(sorted(params.items()))), size=size)
+
+        if candidates is None and seeds is None:
+            return results[0]["image"]
+        return results
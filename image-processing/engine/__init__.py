@@ -0,0 +1,33 @@
+# Image -> G-code vectorization engine, usable without Modal.
+#
+# vectorizer.py wraps it in a Modal app, engine.runner runs it over a folder on local CPUs.
+from .budget import VELOCITY_MODEL, estimate_drawing_time, fit_budget, merge_strokes
+from .config import VectorizeConfig, make_config
+from .gcode import gcode_chunks, gcode_records, points_to_gcode
+from .pipeline import (
+    PREVIEW_SIZE,
+    centerlines_to_paths,
+    contours_to_gcode,
+    contours_to_paths,
+    encode_image,
+    load_image,
+    preview_image,
+    render_svg,
+    select_artifacts,
+    trace_image,
+    trace_paths,
+)
+from .simplify import ramer_douglas_peucker, rdp_importance, rdp_mask, simplify_points, simplify_to_count
+from .svg import contours_to_svg, image_to_svg, simplify_path, svg_to_gcode
+from .tracing import (
+    branch_direction,
+    chain_lines,
+    detect_contours,
+    find_centerlines,
+    find_contours,
+    normalize_paths,
+    pair_branches,
+    refine_points,
+    skeleton_nodes,
+    trace_skeleton,
+)
@@ -0,0 +1,94 @@
+# Drawing time estimates and fitting a drawing into a time or point budget.
+import numpy as np
+
+from .simplify import simplify_to_count
+
+
+# Defaults match automation/api gcode.cfg and the pauses GCodeService makes around pen changes
+VELOCITY_MODEL = {
+    "drawing_size": 0.75,  # meters covered by the longest side of the drawing
+    "draw_velocity": 0.25,  # m/s with the pen down
+    "travel_velocity": 0.25,  # m/s with the pen up
+    "pen_change_time": 2.0,  # seconds to lower and lift the pen for one stroke
+}
+
+
+def _stroke_lengths(paths):
+    return np.array([np.hypot(*np.diff(points, axis=0).T).sum() for points in paths])
+
+
+def _estimate(lengths, starts, ends, points, size, velocity_model):
+    meters_per_unit = velocity_model["drawing_size"] / max(max(size), 1)
+    # Travel goes from the origin to the first stroke, then from each stroke's end to the next start
+    previous_ends = np.vstack((np.zeros((1, 2)), ends[:-1]))
+    draw_length = lengths.sum() * meters_per_unit
+    travel_length = np.hypot(*(starts - previous_ends).T).sum() * meters_per_unit
+
+    draw_time = draw_length / velocity_model["draw_velocity"]
+    travel_time = travel_length / velocity_model["travel_velocity"]
+    pen_time = len(lengths) * velocity_model["pen_change_time"]
+
+    return {
+        "strokes": len(lengths),
+        "points": int(points.sum()),
+        "draw_length": float(draw_length),
+        "travel_length": float(travel_length),
+        "seconds": float(draw_time + travel_time + pen_time),
+    }
+
+
+def estimate_drawing_time(paths, size, velocity_model=VELOCITY_MODEL):
+    # Estimates how long the robot takes to draw paths given in image units.
+    lengths = _stroke_lengths(paths)
+    starts = np.array([points[0] for points in paths]).reshape(-1, 2)
+    ends = np.array([points[-1] for points in paths]).reshape(-1, 2)
+    points = np.array([len(points) for points in paths])
+    return _estimate(lengths, starts, ends, points, size, velocity_model)
+
+
+def merge_strokes(paths, distance):
+    # Joins strokes starting within `distance` of the previous stroke's end, saving a pen change.
+    merged = []
+    for points in paths:
+        if merged and np.hypot(*(points[0] - merged[-1][-1])) <= distance:
+            merged[-1] = np.vstack((merged[-1], points))
+        else:
+            merged.append(points)
+    return merged
+
+
+def fit_budget(paths, size, max_seconds=None, max_points=None, merge_distance=2.0,
+               velocity_model=VELOCITY_MODEL):
+    # Prunes, merges and simplifies strokes until the drawing fits a time and/or point budget.
+    # Strokes are valued by their pen-down length, so specks and tiny loops go first.
+    paths = [np.asarray(points, dtype=np.float64).reshape(-1, 2) for points in paths]
+    paths = [points for points in paths if len(points)]
+    before = estimate_drawing_time(paths, size, velocity_model)
+
+    paths = merge_strokes(paths, merge_distance)
+
+    if max_points is not None and before["points"] > max_points:
+        # Share the point budget between strokes, keeping at least both ends of each
+        ratio = max_points / before["points"]
+        paths = [simplify_to_count(points, max(2, int(len(points) * ratio))) for points in paths]
+        while paths and sum(len(points) for points in paths) > max_points:
+            lengths = _stroke_lengths(paths)
+            paths.pop(int(np.argmin(lengths)))
+
+    if max_seconds is not None and paths:
+        lengths = _stroke_lengths(paths)
+        starts = np.array([points[0] for points in paths])
+        ends = np.array([points[-1] for points in paths])
+        point_counts = np.array([len(points) for points in paths])
+
+        # Drop the least valuable strokes one by one, re-estimating travel between those left
+        keep = np.ones(len(paths), dtype=bool)
+        for index in np.argsort(lengths, kind="stable"):
+            estimate = _estimate(lengths[keep], starts[keep], ends[keep], point_counts[keep], size, velocity_model)
+            if estimate["seconds"] <= max_seconds:
+                break
+            keep[index] = False
+
+        paths = [points for points, kept in zip(paths, keep) if kept]
+
+    return paths, {"before": before, "after": estimate_drawing_time(paths, size, velocity_model)}
@@ -0,0 +1,33 @@
+# Settings of the image -> G-code pipeline in one object.
+from dataclasses import asdict, dataclass, field, replace
+
+from .budget import VELOCITY_MODEL
+
+
+@dataclass
+class VectorizeConfig:
+    """
+    Every setting that changes the G-code traced from an image.
+    """
+
+    mode: str = "outline"  # "outline" follows both sides of every line, "centerline" its middle
+    working_size: int = None  # longest side edges are detected at, None for full resolution
+    refine: bool = False  # snap contours found at the working size back onto full resolution edges
+    simplification_percentage: float = 90.0  # share of the points dropped from every path
+    spur_length: int = 10  # centerline branches from a junction to a free end shorter than this are dropped
+    max_seconds: float = None  # drawing time budget, see fit_budget
+    max_points: int = None  # point budget, see fit_budget
+    merge_distance: float = 2.0  # strokes closer than this are joined when fitting a budget
+    stroke_width: float = 7.0  # of the SVG preview
+    velocity_model: dict = field(default_factory=lambda: dict(VELOCITY_MODEL))
+
+    def replace(self, **options):
+        return replace(self, **options)
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def make_config(config=None, **options):
+    # Config with options overriding the given config or the defaults
+    return (config or VectorizeConfig()).replace(**options)
@@ -0,0 +1,40 @@
+# G-code emission for simplified paths.
+import numpy as np
+
+# G-code lines per record when streaming
+CHUNK_LINES = 500
+
+
+def gcode_chunks(paths):
+    # Yields the G-code of one stroke at a time: lift, travel to its start, lower and draw.
+    # Coordinates of a stroke are formatted in a single call instead of one f-string per point.
+    pen_down = False
+    for points in paths:
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if not len(points):
+            continue
+
+        lift = "G00 Z0.5\n" if pen_down else ""
+        travel = "G00 X%.3f Y%.3f Z0.5\n" % (points[0, 0], points[0, 1])
+        draw = ("G01 X%.3f Y%.3f Z-0.500\n" * len(points)) % tuple(points.ravel())
+        pen_down = True
+
+        yield lift + travel + draw
+
+    yield "G00 Z0.5\n"
+
+
+def points_to_gcode(paths):
+    return "".join(gcode_chunks(paths)).splitlines()
+
+
+def gcode_records(chunks, chunk_lines=CHUNK_LINES):
+    # Regroups G-code text chunks into {"gcode": [...]} records of about chunk_lines lines
+    lines = []
+    for chunk in chunks:
+        lines += chunk.splitlines()
+        if len(lines) >= chunk_lines:
+            yield {"gcode": lines}
+            lines = []
+    if lines:
+        yield {"gcode": lines}
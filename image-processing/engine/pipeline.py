@@ -0,0 +1,125 @@
+# The whole image -> G-code pipeline and the shape of its results.
+import base64
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from .budget import fit_budget
+from .config import make_config
+from .gcode import points_to_gcode
+from .simplify import simplify_points
+from .svg import contours_to_svg
+from .tracing import find_centerlines, find_contours
+
+# Longest side of the image preview sent instead of the full image
+PREVIEW_SIZE = 256
+
+
+def contours_to_paths(contours, simplification_percentage=90.0):
+    # Contours are closed loops, repeat the first point like the SVG 'Z' does
+    closed = (np.vstack((contour, contour[:1])) for contour in contours)
+    return [simplify_points(points, simplification_percentage) for points in closed]
+
+
+def centerlines_to_paths(lines, simplification_percentage=90.0):
+    return [simplify_points(points, simplification_percentage) for points in lines]
+
+
+def contours_to_gcode(contours):
+    return points_to_gcode(contours_to_paths(contours))
+
+
+def load_image(image):
+    # Encoded image bytes (JPEG, PNG) become a PIL image. uint8 RGB arrays and PIL images are
+    # used as they are, so pixels handed over in process are never re-encoded.
+    if isinstance(image, (bytes, bytearray)):
+        return Image.open(BytesIO(image)).convert("RGB")
+    return image
+
+
+def encode_image(image):
+    # Encoded bytes of any image load_image accepts, arrays and PIL images as lossless PNG
+    if isinstance(image, (bytes, bytearray)):
+        return bytes(image)
+
+    stream = BytesIO()
+    (Image.fromarray(image) if isinstance(image, np.ndarray) else image).save(stream, format="PNG")
+    return stream.getvalue()
+
+
+def trace_paths(image, config=None, **options):
+    # Runs the image -> simplified paths part of the pipeline on an image load_image accepts.
+    # options override fields of the config, see VectorizeConfig.
+    config = make_config(config, **options)
+    image = load_image(image)
+
+    if config.mode == "centerline":
+        contours, size = find_centerlines(image, spur_length=config.spur_length)
+        paths = centerlines_to_paths(contours, config.simplification_percentage)
+    else:
+        contours, size = find_contours(image, working_size=config.working_size, refine=config.refine)
+        paths = contours_to_paths(contours, config.simplification_percentage)
+
+    traced = {"paths": paths, "size": size, "svg_paths": contours, "closed": config.mode != "centerline",
+              "config": config}
+    if config.max_seconds is not None or config.max_points is not None:
+        traced["paths"], traced["estimate"] = fit_budget(
+            paths, size, max_seconds=config.max_seconds, max_points=config.max_points,
+            merge_distance=config.merge_distance, velocity_model=config.velocity_model,
+        )
+        # The SVG shows what will actually be drawn
+        traced["svg_paths"], traced["closed"] = traced["paths"], False
+
+    return traced
+
+
+def render_svg(traced):
+    svg = contours_to_svg(traced["svg_paths"], traced["size"], stroke_width=traced["config"].stroke_width,
+                          closed=traced["closed"])
+    return svg.getvalue().decode('utf-8')
+
+
+def preview_image(image_bytes, size=PREVIEW_SIZE):
+    # Small JPEG of the generated image, base64 encoded like the full one
+    image = Image.open(BytesIO(image_bytes)).convert("RGB")
+    image.thumbnail((size, size), Image.LANCZOS)
+    stream = BytesIO()
+    image.save(stream, format="JPEG", quality=80)
+    return base64.b64encode(stream.getvalue()).decode('utf-8')
+
+
+def trace_image(image, config=None, include_svg=True, **options):
+    # Runs the whole image -> G-code pipeline on an image load_image accepts, options go to trace_paths.
+    traced = trace_paths(image, config, **options)
+
+    # Encode the byte content to base64
+    img_base64 = base64.b64encode(encode_image(image)).decode('utf-8')
+    # return json of gcode_output and SVG
+    output = {
+        "gcode": points_to_gcode(traced["paths"]),
+        "image": img_base64,
+    }
+    if "estimate" in traced:
+        output["estimate"] = traced["estimate"]
+    if include_svg:
+        output["svg"] = render_svg(traced)
+
+    return output
+
+
+def select_artifacts(output, svg=True, image="preview", gcode=True):
+    # Trims a full result down to the requested artifacts. image is "full", "preview" or "none".
+    # A result can carry its preview already made, as library entries do.
+    output = dict(output)
+    preview = output.pop("preview", None)
+    if not svg:
+        output.pop("svg", None)
+    if not gcode:
+        output.pop("gcode", None)
+    if image == "preview":
+        output["image"] = preview or preview_image(base64.b64decode(output["image"]))
+    elif image != "full":
+        output.pop("image", None)
+
+    return output
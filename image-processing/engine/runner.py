@@ -0,0 +1,110 @@
+# Vectorizes a folder of images with a local process pool.
+#
+#   python -m engine.runner images/ drawings/ --workers 8 --svg --mode centerline
+#
+# Writes <name>.gcode (and <name>.svg with --svg) for every image. Images whose outputs already
+# exist are skipped unless --overwrite is given, so an interrupted run can simply be restarted.
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .config import VectorizeConfig
+from .gcode import gcode_chunks
+from .pipeline import render_svg, trace_paths
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def output_paths(image_path, output_dir, formats):
+    name = os.path.splitext(os.path.basename(image_path))[0]
+    return {extension: os.path.join(output_dir, f"{name}.{extension}") for extension in formats}
+
+
+def vectorize_file(image_path, output_dir, config, formats=("gcode",)):
+    # Traces one image and writes the requested formats, returns a summary of the drawing.
+    start = time.perf_counter()
+    with open(image_path, "rb") as f:
+        traced = trace_paths(f.read(), config)
+
+    outputs = output_paths(image_path, output_dir, formats)
+    if "gcode" in outputs:
+        with open(outputs["gcode"], "w") as f:
+            f.writelines(gcode_chunks(traced["paths"]))
+    if "svg" in outputs:
+        with open(outputs["svg"], "w") as f:
+            f.write(render_svg(traced))
+
+    return {
+        "image": image_path,
+        "strokes": len(traced["paths"]),
+        "points": sum(len(points) for points in traced["paths"]),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def vectorize_folder(input_dir, output_dir, config=None, workers=None, formats=("gcode",), overwrite=False):
+    # Yields one summary per image in completion order. Failures carry an "error" instead of counts.
+    config = config or VectorizeConfig()
+    os.makedirs(output_dir, exist_ok=True)
+
+    images = sorted(
+        os.path.join(input_dir, name) for name in os.listdir(input_dir)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    if not overwrite:
+        images = [
+            path for path in images
+            if not all(os.path.exists(output) for output in output_paths(path, output_dir, formats).values())
+        ]
+
+    with ProcessPoolExecutor(workers) as pool:
+        futures = {pool.submit(vectorize_file, path, output_dir, config, formats): path for path in images}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                yield {"image": futures[future], "error": str(e)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input_dir", help="Folder of images")
+    parser.add_argument("output_dir", help="Folder the drawings are written to")
+    parser.add_argument("--workers", type=int, default=None, help="Processes, defaults to the CPU count")
+    parser.add_argument("--svg", action="store_true", help="Also write an SVG per image")
+    parser.add_argument("--overwrite", action="store_true", help="Redo images that already have outputs")
+    parser.add_argument("--mode", default="outline", choices=["outline", "centerline"])
+    parser.add_argument("--working-size", type=int, default=None)
+    parser.add_argument("--refine", action="store_true")
+    parser.add_argument("--max-seconds", type=float, default=None)
+    parser.add_argument("--max-points", type=int, default=None)
+    options = parser.parse_args()
+
+    config = VectorizeConfig(
+        mode=options.mode,
+        working_size=options.working_size,
+        refine=options.refine,
+        max_seconds=options.max_seconds,
+        max_points=options.max_points,
+    )
+    formats = ("gcode", "svg") if options.svg else ("gcode",)
+
+    start = time.perf_counter()
+    count = failed = 0
+    for result in vectorize_folder(options.input_dir, options.output_dir, config, workers=options.workers,
+                                   formats=formats, overwrite=options.overwrite):
+        count += 1
+        if "error" in result:
+            failed += 1
+            print(f"{result['image']}: {result['error']}")
+        else:
+            print(f"{result['image']}: {result['strokes']} strokes, {result['points']} points "
+                  f"in {result['seconds']:.2f}s")
+
+    elapsed = time.perf_counter() - start
+    print(f"{count} images ({failed} failed) in {elapsed:.2f}s, {count / max(elapsed, 1e-9):.2f} images/s")
+
+
+if __name__ == "__main__":
+    main()
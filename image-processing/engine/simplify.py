@@ -0,0 +1,105 @@
+# Polyline simplification: Ramer-Douglas-Peucker and simplification to a point budget.
+import numpy as np
+
+
+def _point_line_distances(points, start, end):
+    # Distances from every point in an (n, 2) array to the line through start and end.
+    direction = end - start
+    length = np.hypot(direction[0], direction[1])
+    if length == 0:
+        return np.hypot(points[:, 0] - start[0], points[:, 1] - start[1])
+    cross = direction[0] * (start[1] - points[:, 1]) - direction[1] * (start[0] - points[:, 0])
+    return np.abs(cross) / length
+
+
+def rdp_mask(points, epsilon):
+    # Ramer-Douglas-Peucker with an explicit stack, returns a boolean mask of the points to keep.
+    points = np.ascontiguousarray(points, dtype=np.float64).reshape(-1, 2)
+    keep = np.zeros(len(points), dtype=bool)
+    if len(points) < 3:
+        keep[:] = True
+        return keep
+
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+
+        distances = _point_line_distances(points[first + 1:last], points[first], points[last])
+        index = int(np.argmax(distances))
+        if distances[index] > epsilon:
+            split = first + 1 + index
+            keep[split] = True
+            stack.append((split, last))
+            stack.append((first, split))
+
+    return keep
+
+
+def ramer_douglas_peucker(points, epsilon):
+    # This function simplifies the path using the Ramer-Douglas-Peucker algorithm.
+    points = np.ascontiguousarray(points, dtype=np.float64).reshape(-1, 2)
+    return points[rdp_mask(points, epsilon)]
+
+
+def rdp_importance(points):
+    # Ranks every vertex by the largest RDP epsilon at which it would still be kept.
+    # A vertex is kept by ramer_douglas_peucker(points, epsilon) exactly when its importance is
+    # greater than epsilon, so the ranking is computed once and reused for any point budget.
+    points = np.ascontiguousarray(points, dtype=np.float64).reshape(-1, 2)
+    importance = np.full(len(points), np.inf)
+    if len(points) < 3:
+        return importance
+
+    # Ranges are split level by level, every range of a level in the same vectorized pass.
+    first = np.array([0])
+    last = np.array([len(points) - 1])
+    parent_importance = np.array([np.inf])
+    while len(first):
+        interior = last - first - 1
+        offsets = np.cumsum(interior) - interior
+        segment = np.repeat(np.arange(len(first)), interior)
+        index = np.arange(len(segment)) - offsets[segment] + first[segment] + 1
+
+        start, end = points[first][segment], points[last][segment]
+        direction = end - start
+        length = np.hypot(direction[:, 0], direction[:, 1])
+        cross = direction[:, 0] * (start[:, 1] - points[index, 1]) - direction[:, 1] * (start[:, 0] - points[index, 0])
+        to_start = np.hypot(points[index, 0] - start[:, 0], points[index, 1] - start[:, 1])
+        distances = np.where(length == 0, to_start, np.abs(cross) / np.where(length == 0, 1, length))
+
+        # First point reaching the maximum of each range, like np.argmax in rdp_mask.
+        max_distances = np.maximum.reduceat(distances, offsets)
+        hits = np.flatnonzero(distances == max_distances[segment])
+        split = index[hits[np.flatnonzero(np.diff(segment[hits], prepend=-1))]]
+
+        # A split only happens if every enclosing split happened first.
+        importance[split] = np.minimum(max_distances, parent_importance)
+
+        first = np.concatenate((first, split))
+        last = np.concatenate((split, last))
+        parent_importance = np.tile(importance[split], 2)
+        wide = last - first >= 2
+        first, last, parent_importance = first[wide], last[wide], parent_importance[wide]
+
+    return importance
+
+
+def simplify_to_count(points, count):
+    # Keeps the `count` most important vertices (endpoints always included), in path order.
+    points = np.ascontiguousarray(points, dtype=np.float64).reshape(-1, 2)
+    if count >= len(points):
+        return points
+
+    importance = rdp_importance(points)
+    keep = np.argpartition(-importance, count - 1)[:count]
+    keep.sort()
+    return points[keep]
+
+
+def simplify_points(points, simplification_percentage):
+    original_points_count = len(points)
+    target_points_count = max(2, int(original_points_count * (1 - simplification_percentage / 100.0)))
+    return simplify_to_count(points, target_points_count)
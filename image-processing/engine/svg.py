@@ -0,0 +1,50 @@
+# SVG rendering of traced paths, and the original SVG -> G-code conversion.
+from io import BytesIO, StringIO
+
+import numpy as np
+import svgpathtools
+import svgwrite
+
+from .gcode import points_to_gcode
+from .simplify import simplify_points
+from .tracing import find_contours
+
+
+def contours_to_svg(contours, size, stroke_width=7.0, closed=True):
+    # Create SVG drawing with viewBox
+    width, height = size
+    dwg = svgwrite.Drawing(viewBox=f"0 0 {width} {height}")
+
+    # Add paths for each contour
+    for contour in contours:
+        path_data = "M " + " L ".join(f"{x:g},{y:g}" for x, y in contour)
+        if closed:
+            path_data += " Z"  # Add 'Z' to close the path
+        dwg.add(dwg.path(d=path_data, fill="none", stroke="black", stroke_width=stroke_width))
+
+    # Convert SVG drawing to byte stream
+    svg_string_io = StringIO()
+    dwg.write(svg_string_io)
+    svg_string = svg_string_io.getvalue().encode('utf-8')
+    svg_byte_stream = BytesIO(svg_string)
+    svg_byte_stream.seek(0)
+
+    return svg_byte_stream
+
+
+def image_to_svg(pillow_image, stroke_width=7.0):
+    contours, size = find_contours(pillow_image)
+    return contours_to_svg(contours, size, stroke_width=stroke_width)
+
+
+def simplify_path(path, simplification_percentage):
+    points = np.array([(segment.start.real, segment.start.imag) for segment in path] + [(path[-1].end.real, path[-1].end.imag)])
+    return simplify_points(points, simplification_percentage)
+
+
+def svg_to_gcode(svg_data, simplification_percentage=90.0):
+    # Use io.BytesIO to handle the byte stream
+    svg_stream = BytesIO(svg_data)
+    paths, attributes = svgpathtools.svg2paths(svg_stream)
+
+    return points_to_gcode(simplify_path(path, simplification_percentage) for path in paths)
@@ -0,0 +1,271 @@
+# Image -> polylines: outline contours with OpenCV and centerlines from a skeleton.
+import cv2
+import numpy as np
+from skimage.morphology import skeletonize
+
+
+# 8-neighbourhood offsets (row, column) in ring order, 4-connected ones first when walking
+RING = [(-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1)]
+WALK_ORDER = RING[0::2] + RING[1::2]
+
+
+def skeleton_nodes(skeleton):
+    # Crossing number of every skeleton pixel: 1 at line ends, 2 along lines, 3+ at junctions.
+    padded = np.pad(skeleton, 1).astype(np.int8)
+    height, width = skeleton.shape
+    ring = [padded[1 + dy:1 + dy + height, 1 + dx:1 + dx + width] for dy, dx in RING]
+    crossings = sum((ring[i] == 0) & (ring[(i + 1) % 8] == 1) for i in range(8))
+    return np.where(skeleton, crossings, 0)
+
+
+def branch_direction(line, reach=8):
+    # Unit vector (row, column) from a line's first pixel to a pixel a few steps along it
+    step = np.subtract(line[min(reach, len(line) - 1)], line[0]).astype(np.float64)
+    norm = np.hypot(*step)
+    return step / norm if norm else step
+
+
+def pair_branches(lines, junctions):
+    # Links line ends meeting at the same junction, straightest continuations first. Every pairing
+    # saves a pen lift, so branches are paired even around a sharp turn while two are left.
+    # Line ends are (line index, 0 for its first or 1 for its last pixel).
+    ends_at = {}
+    for index, line_junctions in enumerate(junctions):
+        for end, junction in enumerate(line_junctions):
+            if junction is not None:
+                ends_at.setdefault(junction, []).append((index, end))
+
+    links = {}
+    for ends in ends_at.values():
+        directions = [branch_direction(lines[i] if end == 0 else lines[i][::-1]) for i, end in ends]
+        # Two branches continue each other when they leave the junction in opposite directions
+        pairs = sorted(
+            (float(np.dot(directions[a], directions[b])), a, b)
+            for a in range(len(ends)) for b in range(a + 1, len(ends)) if ends[a][0] != ends[b][0]
+        )
+        for _, a, b in pairs:
+            if ends[a] not in links and ends[b] not in links:
+                links[ends[a]], links[ends[b]] = ends[b], ends[a]
+
+    return links
+
+
+def chain_lines(lines, links):
+    # Joins linked lines into polylines: open chains from their unlinked ends, then closed cycles
+    def oriented(index, end):
+        return lines[index] if end == 0 else lines[index][::-1]
+
+    used = set()
+
+    def follow(index, end):
+        path = list(oriented(index, end))
+        used.add(index)
+        while (index, 1 - end) in links:
+            index, end = links[(index, 1 - end)]
+            if index in used:
+                break
+            line = oriented(index, end)
+            path.extend(line[1:] if line[0] == path[-1] else line)
+            used.add(index)
+        return path
+
+    chains = []
+    for index in range(len(lines)):
+        for end in (0, 1):
+            if index not in used and (index, end) not in links:
+                chains.append(follow(index, end))
+    for index in range(len(lines)):
+        if index not in used:
+            path = follow(index, 0)
+            chains.append(path + path[:1])
+
+    return chains
+
+
+def trace_skeleton(skeleton, spur_length=10, junction_size=10):
+    # Traces a one pixel wide skeleton into open polylines of (x, y) points.
+    # Spurs, lines from a free end to a junction shorter than spur_length pixels, are dropped.
+    # Junctions closer than junction_size pixels along a line count as one, and lines are joined
+    # through the junctions they meet at so every pen stroke follows as much of the drawing as it can.
+    skeleton = skeleton.astype(bool)
+    crossings = skeleton_nodes(skeleton)
+    is_node = skeleton & (crossings != 2)
+    visited = np.zeros_like(skeleton)
+    height, width = skeleton.shape
+
+    def neighbours(pixel):
+        y, x = pixel
+        for dy, dx in WALK_ORDER:
+            if 0 <= y + dy < height and 0 <= x + dx < width and skeleton[y + dy, x + dx]:
+                yield (y + dy, x + dx)
+
+    def walk(path):
+        while True:
+            step = None
+            for pixel in neighbours(path[-1]):
+                if pixel == path[-2] or (pixel == path[0] and len(path) <= 3):
+                    continue
+                if is_node[pixel]:
+                    path.append(pixel)
+                    return path
+                if step is None and not visited[pixel]:
+                    step = pixel
+            if step is None:
+                return path
+            visited[step] = True
+            path.append(step)
+
+    lines = []
+    for node in zip(*np.nonzero(is_node)):
+        node = (int(node[0]), int(node[1]))
+        if crossings[node] == 0:
+            continue  # Isolated pixel
+        for pixel in neighbours(node):
+            if not is_node[pixel] and not visited[pixel]:
+                visited[pixel] = True
+                lines.append(walk([node, pixel]))
+
+    # Touching junction pixels are one junction
+    _, junction_labels = cv2.connectedComponents((skeleton & (crossings >= 3)).astype(np.uint8), connectivity=8)
+
+    # Two lines crossing at a shallow angle thin into two junctions joined by a short bridge,
+    # those are merged into one junction so both lines can be followed straight through.
+    merged = list(range(junction_labels.max() + 1))
+
+    def junction(pixel):
+        label = int(junction_labels[pixel])
+        while merged[label] != label:
+            label = merged[label]
+        return label or None
+
+    kept = []
+    for line in lines:
+        first, last = junction(line[0]), junction(line[-1])
+        free_ends = (crossings[line[0]] == 1) + (crossings[line[-1]] == 1)
+        length = np.hypot(*np.diff(np.array(line, dtype=np.float64), axis=0).T).sum()
+        if length < junction_size and first and last:
+            merged[max(first, last)] = min(first, last)
+        elif not (free_ends == 1 and (first or last) and length < spur_length):
+            kept.append(line)
+
+    junctions = [(junction(line[0]), junction(line[-1])) for line in kept]
+
+    lines = chain_lines(kept, pair_branches(kept, junctions))
+
+    # Whatever is left are closed loops without any junction
+    for start in zip(*np.nonzero(skeleton & ~is_node & ~visited)):
+        start = (int(start[0]), int(start[1]))
+        if visited[start]:
+            continue
+        visited[start] = True
+        path = [start]
+        for pixel in neighbours(start):
+            if not visited[pixel]:
+                visited[pixel] = True
+                path = walk([start, pixel])
+                break
+        lines.append(path + [start])
+
+    polylines = []
+    for line in lines:
+        points = np.array(line, dtype=np.float64)[:, ::-1]
+        # Only keep the pixels where the line changes direction, like CHAIN_APPROX_SIMPLE
+        steps = np.diff(points, axis=0)
+        turns = np.any(steps[1:] != steps[:-1], axis=1)
+        polylines.append(points[np.concatenate(([True], turns, [True]))])
+
+    return polylines
+
+
+def refine_points(points, gray_image, radius):
+    # Snaps every point to the strongest gradient within `radius` pixels in the full resolution image.
+    gradient_x = cv2.Sobel(gray_image, cv2.CV_32F, 1, 0, ksize=3)
+    gradient_y = cv2.Sobel(gray_image, cv2.CV_32F, 0, 1, ksize=3)
+    magnitude = cv2.magnitude(gradient_x, gradient_y)
+
+    offsets = np.arange(-radius, radius + 1)
+    window = np.stack(np.meshgrid(offsets, offsets), axis=-1).reshape(-1, 2)
+    candidates = np.rint(points)[:, None, :].astype(np.int64) + window[None, :, :]
+    candidates[..., 0] = np.clip(candidates[..., 0], 0, gray_image.shape[1] - 1)
+    candidates[..., 1] = np.clip(candidates[..., 1], 0, gray_image.shape[0] - 1)
+
+    strongest = magnitude[candidates[..., 1], candidates[..., 0]].argmax(axis=1)
+    return candidates[np.arange(len(points)), strongest].astype(np.float64)
+
+
+def detect_contours(pillow_image, working_size=None, refine=False):
+    # Outline contours in full resolution pixel coordinates
+    # Convert Pillow image to numpy array
+    np_image = np.array(pillow_image)
+
+    # Convert to grayscale
+    gray_image = cv2.cvtColor(np_image, cv2.COLOR_BGR2GRAY)
+
+    # Detect edges on a downscaled copy when the image is larger than the working size
+    scale = 1.0
+    working_image = gray_image
+    if working_size is not None and max(gray_image.shape) > working_size:
+        scale = working_size / max(gray_image.shape)
+        working_image = cv2.resize(gray_image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    # Apply GaussianBlur to reduce noise and improve edge detection
+    blurred_image = cv2.GaussianBlur(working_image, (5, 5), 0)
+
+    # Apply Canny edge detection
+    edges = cv2.Canny(blurred_image, 90, 150)
+
+    # Dilate edges to get thicker lines, by the same amount in full resolution pixels. A full 3x3
+    # dilation at a low working size merges neighbouring lines into a single outline.
+    kernel_size = int(3 * scale + 0.5) | 1
+    kernel = np.ones((kernel_size, kernel_size), np.uint8)
+    dilated_edges = cv2.dilate(edges, kernel, iterations=1)
+
+    # Find contours from the dilated edges
+    contours, _ = cv2.findContours(dilated_edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    paths = [contour.reshape(-1, 2).astype(np.float64) for contour in contours]
+    if paths and scale != 1.0:
+        # Back to full resolution pixel centers, optionally snapped to the full resolution edges
+        paths = [(points + 0.5) / scale - 0.5 for points in paths]
+        if refine:
+            lengths = np.cumsum([len(points) for points in paths])[:-1]
+            refined = refine_points(np.concatenate(paths), gray_image, int(np.ceil(1 / scale)))
+            paths = np.split(refined, lengths)
+
+    return paths
+
+
+def normalize_paths(paths):
+    # Translate every path so the bounds of the drawing start at (0, 0)
+    if not paths:
+        return [], (0, 0)
+
+    all_points = np.concatenate(paths)
+    min_xy = all_points.min(axis=0)
+    width, height = np.ceil(all_points.max(axis=0) - min_xy) + 1
+
+    return [points - min_xy for points in paths], (int(width), int(height))
+
+
+def find_contours(pillow_image, working_size=None, refine=False):
+    return normalize_paths(detect_contours(pillow_image, working_size=working_size, refine=refine))
+
+
+def find_centerlines(pillow_image, spur_length=10):
+    # Convert Pillow image to grayscale numpy array
+    gray_image = cv2.cvtColor(np.array(pillow_image), cv2.COLOR_BGR2GRAY)
+    blurred_image = cv2.GaussianBlur(gray_image, (5, 5), 0)
+
+    # Dark lines on a light background become the foreground
+    _, binary_image = cv2.threshold(blurred_image, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+
+    # Thin every line down to a one pixel wide skeleton and follow it
+    skeleton = skeletonize(binary_image > 0)
+    if not skeleton.any():
+        return normalize_paths([])
+
+    # Crossing lines split into junctions up to a few line widths apart
+    line_width = 2 * np.median(cv2.distanceTransform(binary_image, cv2.DIST_L2, 3)[skeleton])
+    lines = trace_skeleton(skeleton, spur_length=spur_length, junction_size=3 * line_width)
+
+    return normalize_paths(lines)
@@ -0,0 +1,212 @@
+# Precomputed drawings of common items, served without generating anything.
+#
+#   python library.py build                               # library_catalog.json -> library/
+#   python library.py build --stub --workers 8            # stub images, no Modal deployment needed
+#   python library.py lookup "Two Kittens"
+#
+# The catalog maps each item to its synonyms. Building generates and traces every item once and
+# writes one JSON entry per item (G-code, SVG, full image, preview and stats) plus an index.json
+# of the names, aliases and the VectorizeConfig the entries were traced with. Requests are matched
+# on the normalized item: lowercase, no punctuation or leading article, singular.
+import argparse
+import base64
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from cache import canonical_item
+from engine import (
+    VectorizeConfig,
+    encode_image,
+    estimate_drawing_time,
+    points_to_gcode,
+    preview_image,
+    render_svg,
+    trace_paths,
+)
+from item_names import singular
+
+CATALOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "library_catalog.json")
+INDEX = "index.json"
+
+ARTICLES = ("a", "an", "the", "some", "one", "two", "three")
+
+
+def normalize_item(item):
+    # "  A Red-Apple! " -> "red apple"
+    words = re.sub(r"[^\w\s]", " ", canonical_item(item)).split()
+    while len(words) > 1 and words[0] in ARTICLES:
+        words = words[1:]
+    return " ".join(words)
+
+
+def entry_name(name):
+    return re.sub(r"\W+", "-", name).strip("-") + ".json"
+
+
+def config_signature(config):
+    return json.dumps(config.as_dict(), sort_keys=True, default=str)
+
+
+def library_entry(item, image, config):
+    # Full result of one catalog item, like a vectorizer cache entry plus a stored preview and stats
+    traced = trace_paths(image, config)
+    image_bytes = encode_image(image)
+    paths = traced["paths"]
+
+    return {
+        "item": item,
+        "gcode": points_to_gcode(paths),
+        "svg": render_svg(traced),
+        "image": base64.b64encode(image_bytes).decode('utf-8'),
+        "preview": preview_image(image_bytes),
+        "stats": {
+            "strokes": len(paths),
+            "points": sum(len(points) for points in paths),
+            "estimate": estimate_drawing_time(paths, traced["size"]),
+        },
+    }
+
+
+class DrawingLibrary:
+    """
+    Read-only library built by build_library. Entries are loaded on first use and kept in memory.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._entries = {}
+        self._stats = {"hits": 0, "misses": 0}
+
+        try:
+            with open(os.path.join(directory, INDEX), "r") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {"items": {}, "aliases": {}, "config": None}
+
+        self.items = index["items"]
+        self.aliases = index["aliases"]
+        self.config = index["config"]
+
+    def resolve(self, item):
+        # Catalog name of an item or one of its synonyms, None when the library has no drawing of it
+        name = normalize_item(item)
+        for candidate in (name, singular(name)):
+            if candidate in self.aliases:
+                return self.aliases[candidate]
+        return None
+
+    def get(self, item, config=None):
+        # Full result for the item, None on a miss or when it was traced with another config
+        name = self.resolve(item)
+        if name is None or (config is not None and config_signature(config) != self.config):
+            self._stats["misses"] += 1
+            return None
+
+        if name not in self._entries:
+            with open(os.path.join(self.directory, self.items[name]["file"]), "r") as f:
+                self._entries[name] = json.load(f)
+        self._stats["hits"] += 1
+        return self._entries[name]
+
+    def __contains__(self, item):
+        return self.resolve(item) is not None
+
+    def stats(self):
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+            "items": len(self.items),
+            "aliases": len(self.aliases),
+            "loaded": len(self._entries),
+        }
+
+
+def load_catalog(path=CATALOG):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def build_library(catalog, directory, generate_image, config=None, workers=None, generation_workers=8):
+    # Generates and traces every catalog item, writes the entries and the index. Yields one
+    # summary per item in completion order, failures carry an "error" and are left out of the index.
+    config = config or VectorizeConfig()
+    os.makedirs(directory, exist_ok=True)
+
+    items = {}
+    aliases = {}
+    with ThreadPoolExecutor(generation_workers) as generation_pool, ProcessPoolExecutor(workers) as trace_pool:
+        images = {name: generation_pool.submit(generate_image, name) for name in catalog}
+        entries = {}
+        for name, future in images.items():
+            try:
+                entries[name] = trace_pool.submit(library_entry, name, future.result(), config)
+            except Exception as e:
+                yield {"item": name, "error": str(e)}
+
+        for name, future in entries.items():
+            try:
+                entry = future.result()
+            except Exception as e:
+                yield {"item": name, "error": str(e)}
+                continue
+
+            with open(os.path.join(directory, entry_name(name)), "w") as f:
+                json.dump(entry, f)
+
+            items[name] = {"file": entry_name(name), "synonyms": catalog[name], **entry["stats"]}
+            for alias in [name, *catalog[name]]:
+                aliases[normalize_item(alias)] = name
+            yield {"item": name, **entry["stats"]}
+
+    index = {
+        "config": config_signature(config),
+        "built": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "items": items,
+        "aliases": aliases,
+    }
+    with open(os.path.join(directory, INDEX), "w") as f:
+        json.dump(index, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Generate and trace the catalog")
+    build.add_argument("--catalog", default=CATALOG, help="JSON object of item -> synonyms")
+    build.add_argument("--output", default="library", help="Library directory")
+    build.add_argument("--stub", action="store_true", help="Generate images locally instead of with diffusion")
+    build.add_argument("--workers", type=int, default=None, help="Tracing processes")
+    build.add_argument("--mode", default="outline", choices=["outline", "centerline"])
+
+    lookup = commands.add_parser("lookup", help="Show which library entry serves an item")
+    lookup.add_argument("items", nargs="+")
+    lookup.add_argument("--library", default="library", help="Library directory")
+    options = parser.parse_args()
+
+    if options.command == "lookup":
+        library = DrawingLibrary(options.library)
+        for item in options.items:
+            print(f"{item}: {library.resolve(item) or 'miss'}")
+        return
+
+    from batch import diffusion_image, stub_image
+
+    generate_image = stub_image if options.stub else diffusion_image
+    start = time.perf_counter()
+    for result in build_library(load_catalog(options.catalog), options.output, generate_image,
+                                VectorizeConfig(mode=options.mode), workers=options.workers):
+        if "error" in result:
+            print(f"{result['item']}: {result['error']}")
+        else:
+            print(f"{result['item']}: {result['strokes']} strokes, {result['points']} points, "
+                  f"{result['estimate']['seconds']:.0f}s to draw")
+    print(f"Built {options.output} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
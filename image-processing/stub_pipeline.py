@@ -0,0 +1,43 @@
+# CPU stand-in for the SDXL diffusers pipelines, for exercising diffusion.py without a GPU.
+import time
+import types
+
+import numpy as np
+from PIL import Image
+
+from batch import stub_array
+
+REFERENCE_SIZE = 1024
+
+
+class StubPipeline:
+    """
+    Accepts the arguments diffusion.py passes to the base and refiner pipelines. A call sleeps
+    setup + per_image_step * images * steps seconds (scaled by the pixel count), so batches are
+    cheaper per image like on a GPU, and returns latents or line-art images made from the prompt.
+    """
+
+    def __init__(self, setup=0.05, per_image_step=0.002):
+        self.setup = setup
+        self.per_image_step = per_image_step
+        self.calls = []
+
+    def __call__(self, prompt, negative_prompt=None, num_inference_steps=50, output_type="pil", image=None,
+                 num_images_per_prompt=1, height=None, width=None, **kwargs):
+        prompts = [prompt] if isinstance(prompt, str) else list(prompt)
+        count = len(prompts) * num_images_per_prompt
+        height = height or REFERENCE_SIZE
+        width = width or REFERENCE_SIZE
+        self.calls.append({"images": count, "steps": num_inference_steps, "size": (width, height), **kwargs})
+
+        pixels = height * width / REFERENCE_SIZE ** 2
+        time.sleep(self.setup + self.per_image_step * count * num_inference_steps * pixels)
+
+        if output_type == "latent":
+            return types.SimpleNamespace(images=np.zeros((count, 4, height // 8, width // 8), np.float16))
+
+        images = [
+            Image.fromarray(stub_array(text, size=max(width, height))).resize((width, height))
+            for text in prompts for _ in range(num_images_per_prompt)
+        ]
+        return types.SimpleNamespace(images=images)
@@ -0,0 +1,205 @@
+# Compact binary toolpath format, an alternative to the G-code text the vectorizer emits.
+#
+# A toolpath is a list of strokes, each a pen state (up for travel, down for drawing) and an
+# (n, 2) array of points. Coordinates are quantized to DECIMALS places, the precision of the
+# G-code text, so G-code -> toolpath -> G-code gives back the same lines.
+#
+# Layout, little endian:
+#   header   magic "SDTP", version u8, decimals u8, reserved u16, stroke count u32, point count u32,
+#            bounding box min x, min y, max x, max y as quantized i64
+#   strokes  one varint per stroke: point count << 1 | pen down
+#   points   zigzag varint x and y deltas from the previous point, the first from the box minimum
+#
+# The same module is kept at image-processing/toolpath.py and
+# automation/api/application/services/gcode/toolpath.py. Edit both, tests/test_toolpath_sync.py
+# fails when they differ.
+import struct
+
+import numpy as np
+
+MAGIC = b"SDTP"
+VERSION = 2
+DECIMALS = 3
+MEDIA_TYPE = "application/vnd.spot-draws.toolpath"
+
+HEADER = struct.Struct("<4sBBHII4q")
+# Largest quantized coordinate, deltas between two of them still fit a zigzag varint
+LIMIT = 2 ** 61
+
+# Z heights of the G-code dialect written by the vectorizer
+TRAVEL_Z = "Z0.5"
+DRAW_Z = "Z-0.500"
+
+
+def encode_varints(values):
+    # LEB128 of non-negative integers, all values at once
+    values = np.asarray(values, dtype=np.uint64)
+    sizes = np.ones(len(values), dtype=np.int64)
+    rest = values >> np.uint64(7)
+    while rest.any():
+        sizes += rest > 0
+        rest >>= np.uint64(7)
+
+    output = np.zeros(int(sizes.sum()), dtype=np.uint8)
+    offsets = np.cumsum(sizes) - sizes
+    for byte in range(int(sizes.max(initial=0))):
+        present = sizes > byte
+        bits = (values[present] >> np.uint64(7 * byte)) & np.uint64(0x7F)
+        more = np.where(sizes[present] > byte + 1, 0x80, 0).astype(np.uint64)
+        output[offsets[present] + byte] = (bits | more).astype(np.uint8)
+
+    return output.tobytes()
+
+
+def decode_varints(data, count):
+    # Decodes the first `count` varints of data, returns them and the number of bytes used
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(buffer < 0x80)[:count]
+    if len(ends) < count:
+        raise ValueError("Truncated toolpath")
+    if not count:
+        return np.zeros(0, dtype=np.int64), 0
+
+    buffer = buffer[:ends[-1] + 1].astype(np.int64)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    shifts = 7 * (np.arange(len(buffer)) - np.repeat(starts, ends - starts + 1))
+    return np.add.reduceat((buffer & 0x7F) << shifts, starts), len(buffer)
+
+
+def zigzag(values):
+    return (values << 1) ^ (values >> 63)
+
+
+def unzigzag(values):
+    return (values >> 1) ^ -(values & 1)
+
+
+def encode(strokes, decimals=DECIMALS):
+    """
+    Encodes a list of (pen_down, points) strokes into a binary toolpath.
+    """
+    strokes = [(bool(pen_down), np.asarray(points, dtype=np.float64).reshape(-1, 2)) for pen_down, points in strokes]
+    counts = np.array([len(points) for _, points in strokes], dtype=np.int64)
+    pen = np.array([pen_down for pen_down, _ in strokes], dtype=np.int64)
+
+    if counts.sum():
+        scaled = np.rint(np.concatenate([points for _, points in strokes]) * 10 ** decimals)
+        if not np.all(np.abs(scaled) < LIMIT):
+            raise ValueError(f"Toolpath coordinates must be finite and within ±{LIMIT / 10 ** decimals:g}")
+        quantized = scaled.astype(np.int64)
+        low, high = quantized.min(axis=0), quantized.max(axis=0)
+    else:
+        quantized = np.zeros((0, 2), dtype=np.int64)
+        low = high = np.zeros(2, dtype=np.int64)
+
+    deltas = np.diff(quantized, axis=0, prepend=low[None, :])
+    header = HEADER.pack(MAGIC, VERSION, decimals, 0, len(strokes), len(quantized), *low, *high)
+
+    return header + encode_varints(counts << 1 | pen) + encode_varints(zigzag(deltas.ravel()))
+
+
+def read_header(data):
+    """
+    Returns the header of a binary toolpath as a dict, without decoding the points.
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("Truncated toolpath")
+    magic, version, decimals, _, stroke_count, point_count, *box = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a toolpath")
+    if version != VERSION:
+        raise ValueError(f"Unsupported toolpath version {version}")
+
+    scale = 10 ** -decimals
+    return {
+        "decimals": decimals,
+        "strokes": stroke_count,
+        "points": point_count,
+        "min": (box[0] * scale, box[1] * scale),
+        "max": (box[2] * scale, box[3] * scale),
+    }
+
+
+def decode(data):
+    """
+    Decodes a binary toolpath into a list of (pen_down, points) strokes.
+    """
+    header = read_header(data)
+    offset = HEADER.size
+
+    stroke_table, used = decode_varints(data[offset:], header["strokes"])
+    offset += used
+    deltas, _ = decode_varints(data[offset:], 2 * header["points"])
+
+    counts, pen = stroke_table >> 1, stroke_table & 1
+    if counts.sum() != header["points"]:
+        raise ValueError("Corrupt toolpath")
+
+    low = np.array(HEADER.unpack_from(data)[6:8], dtype=np.int64)
+    quantized = np.cumsum(unzigzag(deltas).reshape(-1, 2), axis=0) + low
+    points = np.split(quantized / 10 ** header["decimals"], np.cumsum(counts)[:-1])
+
+    return [(bool(pen_down), stroke) for pen_down, stroke in zip(pen, points)]
+
+
+def paths_to_strokes(paths):
+    # The vectorizer travels to the start of every path, then draws all of it
+    strokes = []
+    for points in paths:
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(points):
+            strokes += [(False, points[:1]), (True, points)]
+    return strokes
+
+
+def from_gcode(lines):
+    """
+    Parses G-code written by the vectorizer into strokes. Lifts without coordinates are implied by the
+    pen states and dropped, anything else raises a ValueError.
+    """
+    if isinstance(lines, str):
+        lines = lines.splitlines()
+
+    strokes = []
+    for line in lines:
+        parts = line.split()
+        if not parts or parts == ["G00", TRAVEL_Z]:
+            continue
+        if len(parts) != 4 or parts[1][:1] != "X" or parts[2][:1] != "Y" or \
+                (parts[0], parts[3]) not in (("G00", TRAVEL_Z), ("G01", DRAW_Z)):
+            raise ValueError(f"Unsupported G-code line: {line}")
+
+        pen_down = parts[0] == "G01"
+        point = (float(parts[1][1:]), float(parts[2][1:]))
+        if strokes and strokes[-1][0] == pen_down:
+            strokes[-1][1].append(point)
+        else:
+            strokes.append((pen_down, [point]))
+
+    return [(pen_down, np.array(points)) for pen_down, points in strokes]
+
+
+def to_gcode(strokes, decimals=DECIMALS):
+    """
+    Writes strokes as G-code lines, the same lines the vectorizer emits for them.
+    """
+    lines = []
+    pen_down = False
+    for stroke_pen_down, points in strokes:
+        if pen_down and not stroke_pen_down:
+            lines.append(f"G00 {TRAVEL_Z}")
+        code, z = ("G01", DRAW_Z) if stroke_pen_down else ("G00", TRAVEL_Z)
+        template = f"{code} X%.{decimals}f Y%.{decimals}f {z}\n"
+        lines += ((template * len(points)) % tuple(np.ravel(points))).splitlines()
+        pen_down = stroke_pen_down
+
+    lines.append(f"G00 {TRAVEL_Z}")
+    return lines
+
+
+def gcode_to_toolpath(lines):
+    return encode(from_gcode(lines))
+
+
+def toolpath_to_gcode(data):
+    return "\n".join(to_gcode(decode(data)))
@@ -1,8 +1,11 @@
-from io import BytesIO, StringIO
+import os
 
 from modal import (
     App,
     Image,
+    Mount,
+    enter,
+    method,
     web_endpoint,
     gpu
 )
@@ -18,162 +21,333 @@ vectorizer = (
         "opencv-python",
         "svgpathtools",
         "svgwrite",
+        "scikit-image",
     )
 )
 
 app = App("vectorizer")
 
-with vectorizer.imports():
-    import numpy as np
-    import modal
-    import io
-    import svgpathtools
-    import base64
-    import cv2
-    import svgwrite
+CACHE_DIR = os.getenv("VECTORIZER_CACHE_DIR", "/tmp/vectorizer-cache")
+CACHE_MAX_BYTES = int(os.getenv("VECTORIZER_CACHE_MAX_BYTES", 512 * 1024 * 1024))
 
-    from PIL import Image
-    from svgpathtools import Path, Line
-
-def ramer_douglas_peucker(points, epsilon):
-    # This function simplifies the path using the Ramer-Douglas-Peucker algorithm.
-    if len(points) < 3:
-        return points
-
-    def point_line_distance(point, start, end):
-        if np.array_equal(start, end):
-            return np.linalg.norm(np.array(point) - np.array(start))
-        else:
-            return np.abs(np.cross(end - start, start - point)) / np.linalg.norm(end - start)
+# How generated images are handed over: "jpeg", "png" (lossless, about 3x slower to encode, no trace
+# difference measured so far) or "array" (raw pixels, large over the network)
+HANDOFF_FORMAT = os.getenv("VECTORIZER_HANDOFF_FORMAT", "jpeg")
 
-    start, end = np.array(points[0]), np.array(points[-1])
-    distances = [point_line_distance(np.array(point), start, end) for point in points[1:-1]]
-    max_distance = max(distances)
+# Part of every cache key along with the generation profile ("draft" or "final", see diffusion.PROFILES)
+GENERATION_PARAMS = {"app": "stable-diffusion-xl", "format": HANDOFF_FORMAT}
+DEFAULT_PROFILE = "final"
 
-    if max_distance > epsilon:
-        index = distances.index(max_distance) + 1
-        return ramer_douglas_peucker(points[:index + 1], epsilon)[:-1] + ramer_douglas_peucker(points[index:], epsilon)
-    else:
-        return [points[0], points[-1]]
+# Precomputed drawings built with `python library.py build`, mounted when the directory exists
+LIBRARY_DIR = os.getenv("VECTORIZER_LIBRARY_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "library"))
+LIBRARY_PATH = "/root/library"
+library_mounts = [Mount.from_local_dir(LIBRARY_DIR, remote_path=LIBRARY_PATH)] if os.path.isdir(LIBRARY_DIR) else []
 
-@app.cls(container_idle_timeout=1200, image=vectorizer)
+with vectorizer.imports():
+    import modal
+    import base64
+    import json
+    import queue
+    import threading
+
+    from cache import ResultCache, cache_key
+    from engine import (
+        VectorizeConfig,
+        encode_image,
+        gcode_chunks,
+        gcode_records,
+        image_to_svg,
+        render_svg,
+        select_artifacts,
+        simplify_path,
+        svg_to_gcode,
+        trace_image,
+        trace_paths,
+    )
+    from fastapi.responses import Response, StreamingResponse
+    from library import DrawingLibrary
+    from toolpath import MEDIA_TYPE as TOOLPATH_MEDIA_TYPE, gcode_to_toolpath
+
+def handed_off(image):
+    # Encoded images arrive as a BytesIO, arrays as they are
+    return image.getvalue() if hasattr(image, "getvalue") else image
+
+def ndjson_lines(records):
+    return (json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+
+def merged_results(maps):
+    # Iterates every map in its own thread and yields the results as they arrive from any of them.
+    # Exceptions the maps return (a lost container) become {"error"} records, then {"done": count}.
+    results = queue.Queue()
+
+    def drain(start_map):
+        try:
+            for result in start_map():
+                results.put({"error": str(result)} if isinstance(result, Exception) else result)
+        except Exception as e:
+            results.put({"error": str(e)})
+        finally:
+            results.put(None)
+
+    for start_map in maps:
+        threading.Thread(target=drain, args=(start_map,), daemon=True).start()
+
+    count = 0
+    remaining = len(maps)
+    while remaining:
+        result = results.get()
+        if result is None:
+            remaining -= 1
+            continue
+        count += 1
+        yield result
+    yield {"done": count}
+
+
+@app.cls(container_idle_timeout=1200, image=vectorizer, mounts=library_mounts)
 class Model:
 
     def image_to_svg(self, pillow_image, stroke_width=7.0):
-        # Convert Pillow image to numpy array
-        np_image = np.array(pillow_image)
-
-        # Convert to grayscale
-        gray_image = cv2.cvtColor(np_image, cv2.COLOR_BGR2GRAY)
-
-        # Apply GaussianBlur to reduce noise and improve edge detection
-        blurred_image = cv2.GaussianBlur(gray_image, (5, 5), 0)
-
-        # Apply Canny edge detection
-        edges = cv2.Canny(blurred_image, 90, 150)
-
-        # Dilate edges to get thicker lines
-        kernel = np.ones((3, 3), np.uint8)
-        dilated_edges = cv2.dilate(edges, kernel, iterations=1)
-
-        # Find contours from the dilated edges
-        contours, _ = cv2.findContours(dilated_edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-        # Determine the bounds of all contours
-        min_x, min_y = np.inf, np.inf
-        max_x, max_y = -np.inf, -np.inf
-        for contour in contours:
-            x, y, w, h = cv2.boundingRect(contour)
-            min_x = min(min_x, x)
-            min_y = min(min_y, y)
-            max_x = max(max_x, x + w)
-            max_y = max(max_y, y + h)
-
-        # Calculate offsets
-        offset_x = -min_x
-        offset_y = -min_y
-
-        # Create SVG drawing with viewBox
-        width = max_x - min_x
-        height = max_y - min_y
-        dwg = svgwrite.Drawing(viewBox=f"0 0 {width} {height}")
-
-        # Add paths for each contour
-        for contour in contours:
-            path_data = "M " + " L ".join(f"{point[0][0] + offset_x},{point[0][1] + offset_y}" for point in contour)
-            path_data += " Z"  # Add 'Z' to close the path
-            dwg.add(dwg.path(d=path_data, fill="none", stroke="black", stroke_width=stroke_width))
-
-        # Convert SVG drawing to byte stream
-        svg_string_io = StringIO()
-        dwg.write(svg_string_io)
-        svg_string = svg_string_io.getvalue().encode('utf-8')
-        svg_byte_stream = BytesIO(svg_string)
-        svg_byte_stream.seek(0)
-
-        return svg_byte_stream
+        return image_to_svg(pillow_image, stroke_width=stroke_width)
 
     def simplify_path(self, path, simplification_percentage):
-        points = [(segment.start.real, segment.start.imag) for segment in path] + [(path[-1].end.real, path[-1].end.imag)]
-        epsilon = 0.1
-        original_points_count = len(points)
-        target_points_count = max(2, int(original_points_count * (1 - simplification_percentage / 100.0)))
-        simplified_points = ramer_douglas_peucker(points, epsilon)
-        while len(simplified_points) > target_points_count:
-            epsilon *= 1.1
-            simplified_points = ramer_douglas_peucker(points, epsilon)
-        return simplified_points
+        return simplify_path(path, simplification_percentage)
 
     def svg_to_gcode(self, svg_data):
-        # Use io.BytesIO to handle the byte stream
-        svg_stream = io.BytesIO(svg_data)
-        paths, attributes = svgpathtools.svg2paths(svg_stream)
-        gcode = []
-
-        matrix_of_coords = []  # code, x, y, z
-
-        for path in paths:
-            simplified_points = self.simplify_path(path, float(90))
-            start_point = simplified_points[0]
-            gcode.append(f"G00 X{start_point[0]:.3f} Y{start_point[1]:.3f} Z0.5")  # Lift pen and move to start
-
-            for point in simplified_points:
-                x, y = point
-                matrix_of_coords.append(['G01', x, y, 0])
-
-        for coord in matrix_of_coords:
-            gcode.append(f"{coord[0]} X{coord[1]:.3f} Y{coord[2]:.3f} Z-0.500")
+        return svg_to_gcode(svg_data)
+
+    @enter()
+    def load_cache(self):
+        self.cache = ResultCache(CACHE_DIR, max_bytes=CACHE_MAX_BYTES)
+        self.library = DrawingLibrary(LIBRARY_PATH)
+
+    def _key(self, item, config, profile=DEFAULT_PROFILE, seed=None, candidate=None):
+        # candidate tells apart unseeded drawings of the same item asked for in parallel
+        generation = dict(GENERATION_PARAMS, profile=profile)
+        if seed is not None:
+            generation["seed"] = seed
+        elif candidate is not None:
+            generation["candidate"] = candidate
+        return cache_key(item, generation=generation, **config.as_dict())
+
+    def _cached(self, item, use_cache, config, profile=DEFAULT_PROFILE, seed=None, candidate=None):
+        # Returns the cache key and the library or cached full result, if any. The library serves
+        # every profile, but only one drawing per item: a seed or a candidate past the first skips it.
+        key = self._key(item, config, profile, seed, candidate)
+        if not use_cache:
+            return key, None
+        if seed is None and not candidate:
+            entry = self.library.get(item, config)
+            if entry is not None:
+                return key, dict(entry, library=True)
+        return key, self.cache.get(key)
+
+    def _generate(self, item, profile=DEFAULT_PROFILE, count=1, seeds=None):
+        # Returns {"seed", "image", "generation"} candidates, generation holds the profile's parameters
+        diffusion_function = modal.Function.lookup("stable-diffusion-xl", "Model.inference")
 
-        gcode.append("G00 Z0.5")
+        candidates = diffusion_function.remote(item=item, candidates=None if seeds else count, seeds=seeds,
+                                               format=HANDOFF_FORMAT, profile=profile)
 
-        return gcode  
+        return [dict(candidate, image=handed_off(candidate["image"])) for candidate in candidates]
 
-    def _vectorize(self, item):
-        diffusion_function = modal.Function.lookup("stable-diffusion-xl", "Model.inference")
+    def _traced_output(self, item, candidate, config):
+        # Full result of one generated image, as cached
+        output = trace_image(candidate["image"], config, include_svg=True)
+        output.update(item=item, seed=candidate["seed"], generation=candidate["generation"])
+        return output
 
-        img = diffusion_function.remote(item=item)
+    def _vectorize(self, item, include_svg=True, include_image="preview", include_gcode=True, use_cache=True,
+                   profile=DEFAULT_PROFILE, seed=None, candidate=None, **options):
+        # options are VectorizeConfig fields, a seed regenerates a candidate from _vectorize_candidates.
+        # Clients asking for several drawings with parallel calls pass a different candidate index in each.
+        config = VectorizeConfig(**options)
+        key, output = self._cached(item, use_cache, config, profile, seed, candidate)
+        cached = output is not None
+
+        if not cached:
+            # The SVG and full image are always kept so the cached entry can serve every request
+            candidate = self._generate(item, profile, seeds=None if seed is None else [seed])[0]
+            output = self._traced_output(item, candidate, config)
+            self.cache.put(key, output)
+
+        output = dict(output, cached=cached)
+
+        return select_artifacts(output, svg=include_svg, image=include_image, gcode=include_gcode)
+
+    def _vectorize_candidates(self, item, count=4, seeds=None, include_svg=True, include_image="preview",
+                              include_gcode=True, profile=DEFAULT_PROFILE, **options):
+        # Several drawings of one item from a single diffusion call, each with the seed that regenerates it.
+        # Every candidate is cached like a _vectorize result with that seed.
+        config = VectorizeConfig(**options)
+
+        outputs = []
+        for candidate in self._generate(item, profile, count=count, seeds=seeds):
+            output = self._traced_output(item, candidate, config)
+            self.cache.put(self._key(item, config, profile, candidate["seed"]), output)
+
+            output = dict(output, cached=False)
+            outputs.append(select_artifacts(output, svg=include_svg, image=include_image, gcode=include_gcode))
+
+        return outputs
+
+    def _vectorize_stream(self, item, include_svg=True, include_image="preview", use_cache=True,
+                          profile=DEFAULT_PROFILE, **options):
+        # Yields NDJSON records: {"item", "cached"}, {"gcode": [...]} chunks as they are emitted, then
+        # {"estimate"}, {"seed"}, {"generation"}, {"svg"} and {"image"} when present and requested, and
+        # finally {"done": lines}.
+        config = VectorizeConfig(**options)
+        key, output = self._cached(item, use_cache, config, profile)
+        cached = output is not None
+        yield {"item": item, "cached": cached}
+
+        if cached:
+            gcode = output["gcode"]
+            yield from gcode_records(line + "\n" for line in gcode)
+        else:
+            candidate = self._generate(item, profile)[0]
+            image = candidate["image"]
+            traced = trace_paths(image, config)
+
+            gcode = []
+            for record in gcode_records(gcode_chunks(traced["paths"])):
+                gcode += record["gcode"]
+                yield record
+
+            output = {"gcode": gcode, "image": base64.b64encode(encode_image(image)).decode('utf-8'),
+                      "svg": render_svg(traced), "item": item, "seed": candidate["seed"],
+                      "generation": candidate["generation"]}
+            if "estimate" in traced:
+                output["estimate"] = traced["estimate"]
+            self.cache.put(key, output)
+
+        tail = select_artifacts(output, svg=include_svg, image=include_image, gcode=False)
+        for name in ("estimate", "seed", "generation", "svg", "image"):
+            if name in tail:
+                yield {name: tail[name]}
+        yield {"done": len(gcode)}
+
+    @method()
+    def vectorize(self, item, **options):
+        return self._vectorize(item, **options)
+
+    @method()
+    def vectorize_candidates(self, item, **options):
+        return self._vectorize_candidates(item, **options)
+
+    def _trace(self, image_bytes, index=None, include_image="preview", include_gcode=True, **options):
+        output = trace_image(image_bytes, **options)
+        output["index"] = index
+
+        return select_artifacts(output, image=include_image, gcode=include_gcode)
+
+    @method()
+    def trace(self, image_bytes, index=None, **options):
+        return self._trace(image_bytes, index, **options)
+
+    # Batch versions of vectorize and trace: a failure comes back as {"item" or "index", "error"}
+    # so it does not fail the rest of the batch
+    @method()
+    def vectorize_entry(self, item, **options):
+        try:
+            return self._vectorize(item, **options)
+        except Exception as e:
+            return {"item": item, "error": str(e)}
+
+    @method()
+    def trace_entry(self, image_bytes, index, **options):
+        try:
+            return self._trace(image_bytes, index, **options)
+        except Exception as e:
+            return {"index": index, "error": str(e)}
 
-        # Convert byte stream to SVG
-        img.seek(0)
-        image = Image.open(img)
-        svg = self.image_to_svg(image)
+    @web_endpoint()
+    def web_vectorize(self, item, svg: bool = True, image: str = "preview", gcode: bool = True,
+                      max_seconds: float = None, max_points: int = None, mode: str = "outline",
+                      working_size: int = None, refine: bool = False, cache: bool = True, seed: int = None,
+                      profile: str = DEFAULT_PROFILE, candidate: int = None):
+        # image is "preview" (downscaled), "full" or "none". profile is "draft" (fast) or "final".
+        # candidate (0, 1, ...) keeps parallel calls for the same item from sharing one cached drawing.
+        return self._vectorize(item, include_svg=svg, include_image=image, include_gcode=gcode, use_cache=cache,
+                               profile=profile, seed=seed, candidate=candidate, max_seconds=max_seconds, max_points=max_points, mode=mode,
+                               working_size=working_size, refine=refine)
 
-        gcode_output = self.svg_to_gcode(svg.getvalue())
+    @web_endpoint()
+    def web_vectorize_candidates(self, item, count: int = 4, seeds: str = None, svg: bool = True,
+                                 image: str = "preview", gcode: bool = True, max_seconds: float = None,
+                                 max_points: int = None, mode: str = "outline", working_size: int = None,
+                                 refine: bool = False, profile: str = DEFAULT_PROFILE):
+        # seeds is a comma separated list, it replaces count. Pass a candidate's seed to web_vectorize to redraw it.
+        seeds = [int(seed) for seed in seeds.split(",")] if seeds else None
+        return {"results": self._vectorize_candidates(
+            item, count=count, seeds=seeds, profile=profile, include_svg=svg, include_image=image, include_gcode=gcode,
+            max_seconds=max_seconds, max_points=max_points, mode=mode, working_size=working_size, refine=refine,
+        )}
 
-        # Get the byte content
-        img_byte_content = img.getvalue()
+    @web_endpoint()
+    def web_vectorize_stream(self, item, svg: bool = False, image: str = "none", max_seconds: float = None,
+                             max_points: int = None, mode: str = "outline", working_size: int = None,
+                             refine: bool = False, cache: bool = True, profile: str = DEFAULT_PROFILE):
+        # Same as web_vectorize as chunked NDJSON, G-code first. Defaults to G-code only for the robot.
+        records = self._vectorize_stream(item, include_svg=svg, include_image=image, use_cache=cache, profile=profile,
+                                         max_seconds=max_seconds, max_points=max_points, mode=mode,
+                                         working_size=working_size, refine=refine)
+        return StreamingResponse(ndjson_lines(records), media_type="application/x-ndjson")
 
-        # Encode the byte content to base64
-        img_base64 = base64.b64encode(img_byte_content).decode('utf-8')
-        # return json of gcode_output and SVG
-        output = {
-            "gcode": gcode_output,
-            "svg": svg.getvalue(),
-            "image": img_base64,
-        }
+    @web_endpoint()
+    def web_vectorize_toolpath(self, item, max_seconds: float = None, max_points: int = None,
+                               mode: str = "outline", working_size: int = None, refine: bool = False,
+                               cache: bool = True, profile: str = DEFAULT_PROFILE):
+        # G-code only, as a binary toolpath (see toolpath.py) for the automation API
+        output = self._vectorize(item, include_svg=False, include_image="none", use_cache=cache, profile=profile,
+                                 max_seconds=max_seconds, max_points=max_points, mode=mode,
+                                 working_size=working_size, refine=refine)
+        return Response(gcode_to_toolpath(output["gcode"]), media_type=TOOLPATH_MEDIA_TYPE)
 
-        return output
+    @web_endpoint()
+    def web_cache_stats(self):
+        # Hit/miss counters are per container
+        return self.cache.stats()
 
     @web_endpoint()
-    def web_vectorize(self, item):
-        return self._vectorize(item, )
+    def web_library(self):
+        # Items the library serves without generating, with their synonyms and drawing stats
+        return {"items": self.library.items, "stats": self.library.stats()}
+
+    @web_endpoint(method="POST")
+    def web_cache_invalidate(self, item: str = None):
+        # Drops every cached variant of an item, or the whole cache when no item is given
+        return {"invalidated": self.cache.invalidate(item=item)}
+
+    @web_endpoint(method="POST")
+    def web_vectorize_batch(self, body: dict):
+        # Body: {"items": [...], "images": [base64, ...], plus the web_vectorize options}
+        # Every item or image is processed in its own container, items and images at the same time.
+        # Streams NDJSON in completion order: one result per item or image, failures as
+        # {"item" or "index", "error"}, then {"done": count}.
+        options = dict(
+            include_svg=body.get("svg", True),
+            include_image=body.get("image", "preview"),
+            include_gcode=body.get("gcode", True),
+            max_seconds=body.get("max_seconds"),
+            max_points=body.get("max_points"),
+            mode=body.get("mode", "outline"),
+            working_size=body.get("working_size"),
+            refine=body.get("refine", False),
+        )
+        items = body.get("items", [])
+        images = body.get("images", [])
+
+        maps = []
+        if items:
+            vectorize_function = modal.Function.lookup("vectorizer", "Model.vectorize_entry")
+            profile = body.get("profile", DEFAULT_PROFILE)
+            maps.append(lambda: vectorize_function.map(items, kwargs=dict(options, profile=profile),
+                                                       order_outputs=False, return_exceptions=True))
+        if images:
+            trace_function = modal.Function.lookup("vectorizer", "Model.trace_entry")
+            image_bytes = [base64.b64decode(image.split(",")[-1]) for image in images]
+            maps.append(lambda: trace_function.map(image_bytes, range(len(image_bytes)), kwargs=options,
+                                                   order_outputs=False, return_exceptions=True))
+
+        return StreamingResponse(ndjson_lines(merged_results(maps)), media_type="application/x-ndjson")
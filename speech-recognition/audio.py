@@ -0,0 +1,161 @@
+import io
+import os
+import subprocess
+import uuid
+import wave
+
+import numpy as np
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart before 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+SAMPLE_RATE = 16000  # what Whisper expects
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 25 * 1024 * 1024))
+# When set, every upload is also written to this directory under a unique name, for debugging
+DEBUG_UPLOAD_DIR = os.getenv("DEBUG_UPLOAD_DIR")
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class AudioDecodeError(Exception):
+    pass
+
+
+class _AudioPart:
+    # Collects the audio file part of a multipart body as python-multipart parses it
+    def __init__(self, field):
+        self.field = field
+        self.filename = None
+        self.chunks = []
+        self._header_field = b""
+        self._header_value = b""
+        self._disposition = {}
+        self._done = False
+
+    def callbacks(self):
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self):
+        self._disposition = {}
+
+    def on_header_field(self, data, start, end):
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        if self._header_field.lower() == b"content-disposition":
+            _, self._disposition = parse_options_header(self._header_value)
+        self._header_field = self._header_value = b""
+
+    def _wanted(self):
+        return not self._done and self._disposition.get(b"name") == self.field.encode()
+
+    def on_part_data(self, data, start, end):
+        if self._wanted():
+            self.chunks.append(bytes(data[start:end]))
+
+    def on_part_end(self):
+        if self._wanted():
+            filename = self._disposition.get(b"filename")
+            self.filename = filename.decode(errors="replace") if filename else None
+            self._done = True
+
+
+async def read_upload(request, field="audio_file", max_bytes=MAX_UPLOAD_BYTES):
+    """
+    Reads the audio of a request from its body stream, failing with UploadTooLarge as soon as more
+    than max_bytes have arrived. Nothing is spooled to disk. The audio is the `field` file of a
+    multipart form, or the whole body for any other content type.
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    part = None
+    if content_type == b"multipart/form-data":
+        if b"boundary" not in options:
+            raise AudioDecodeError("Multipart body without a boundary")
+        part = _AudioPart(field)
+        parser = MultipartParser(options[b"boundary"], part.callbacks())
+
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLarge(f"Upload is larger than {max_bytes} bytes")
+        if part is not None:
+            parser.write(chunk)
+        else:
+            chunks.append(chunk)
+
+    if part is not None:
+        parser.finalize()
+        if not part.chunks:
+            raise AudioDecodeError(f"No {field} file in the form")
+        chunks, filename = part.chunks, part.filename
+    else:
+        filename = None
+    data = b"".join(chunks)
+
+    if DEBUG_UPLOAD_DIR:
+        os.makedirs(DEBUG_UPLOAD_DIR, exist_ok=True)
+        with open(os.path.join(DEBUG_UPLOAD_DIR, f"{uuid.uuid4().hex}-{os.path.basename(filename or '')}"),
+                  "wb") as f:
+            f.write(data)
+
+    return data
+
+
+def decode_wav(data):
+    # PCM WAV already at 16 kHz, without ffmpeg. Returns None for anything else.
+    try:
+        with wave.open(io.BytesIO(data)) as f:
+            if f.getframerate() != SAMPLE_RATE or f.getsampwidth() not in (1, 2, 4):
+                return None
+            channels, width = f.getnchannels(), f.getsampwidth()
+            frames = f.readframes(f.getnframes())
+    except (wave.Error, EOFError):
+        return None
+
+    if width == 1:
+        samples = (np.frombuffer(frames, np.uint8).astype(np.float32) - 128) / 128
+    else:
+        dtype = np.int16 if width == 2 else np.int32
+        samples = np.frombuffer(frames, dtype).astype(np.float32) / np.iinfo(dtype).max
+    return samples.reshape(-1, channels).mean(axis=1)
+
+
+def decode_ffmpeg(data):
+    # Same conversion as whisper.load_audio, fed through pipes instead of a file
+    command = [
+        "ffmpeg", "-nostdin", "-threads", "0", "-i", "pipe:0",
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE), "pipe:1",
+    ]
+    try:
+        output = subprocess.run(command, input=data, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise AudioDecodeError(f"Failed to decode audio: {e.stderr.decode(errors='replace')[-500:]}") from e
+    return np.frombuffer(output, np.int16).astype(np.float32) / 32768.0
+
+
+def decode_audio(data):
+    """
+    Decodes an uploaded audio file into 16 kHz mono float32 samples. The format is read from the
+    content, not the file name: the frontend sends WebM named recording.wav.
+    """
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        samples = decode_wav(data)
+        if samples is not None:
+            return samples
+    return decode_ffmpeg(data)
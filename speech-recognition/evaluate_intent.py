@@ -0,0 +1,82 @@
+# Evaluates the local intent extractor against a transcript corpus.
+#
+#   python evaluate_intent.py
+#   python evaluate_intent.py --threshold 0.7 --llm-latency 1.2
+#   python evaluate_intent.py --call-llm     # times the LLM fallback, point OPENAI_BASE_URL at stub_openai.py
+#
+# Every line of the corpus is {"transcript", "item"}, item is null for transcripts that ask for
+# nothing. Reports how many transcripts are resolved locally, how many of those are right, what
+# the extraction costs and the LLM round trips it saves.
+import argparse
+import json
+import time
+
+import numpy as np
+
+from intent import INTENT_THRESHOLD, extract_intent, singular
+
+
+def same_item(found, expected):
+    return found is not None and expected is not None and singular(found) == singular(expected.lower())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default="intent_corpus.jsonl")
+    parser.add_argument("--threshold", type=float, default=INTENT_THRESHOLD)
+    parser.add_argument("--llm-latency", type=float, default=1.0,
+                        help="Seconds an LLM interpretation takes, when not measured with --call-llm")
+    parser.add_argument("--call-llm", action="store_true", help="Send the transcripts left over to the LLM")
+    parser.add_argument("--verbose", action="store_true", help="Print every transcript")
+    options = parser.parse_args()
+
+    with open(options.corpus) as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+
+    local_times = []
+    hits = correct = wrong = 0
+    fallback = []
+    for example in corpus:
+        start = time.perf_counter()
+        intent = extract_intent(example["transcript"])
+        local_times.append(time.perf_counter() - start)
+
+        hit = intent["confidence"] >= options.threshold
+        if hit:
+            hits += 1
+            if same_item(intent["item"], example["item"]):
+                correct += 1
+            else:
+                wrong += 1
+        else:
+            fallback.append(example)
+
+        if options.verbose or (hit and not same_item(intent["item"], example["item"])):
+            status = "local" if hit else "llm"
+            print(f"{status:>5} {intent['confidence']:.2f} {str(intent['item']):>15} "
+                  f"(expected {example['item']})  {example['transcript']}")
+
+    llm_latency = options.llm_latency
+    if options.call_llm and fallback:
+        from open_ai_recognition import interpret_with_llm
+
+        llm_times = []
+        for example in fallback:
+            start = time.perf_counter()
+            interpret_with_llm(example["transcript"])
+            llm_times.append(time.perf_counter() - start)
+        llm_latency = float(np.mean(llm_times))
+
+    count = len(corpus)
+    print(f"\n{count} transcripts, threshold {options.threshold}")
+    print(f"  resolved locally   {hits} ({hits / count:.0%}), {correct} right, {wrong} wrong "
+          f"({correct / hits if hits else 0:.0%} precision)")
+    print(f"  sent to the LLM    {len(fallback)} ({len(fallback) / count:.0%})")
+    print(f"  local extraction   mean {np.mean(local_times) * 1e6:.0f}us, max {max(local_times) * 1e6:.0f}us")
+    print(f"  LLM latency        {llm_latency:.2f}s per call ({'measured' if options.call_llm else 'assumed'})")
+    saved = hits * llm_latency - sum(local_times)
+    print(f"  latency saved      {saved:.1f}s in total, {saved / count:.2f}s per transcript on average")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import os
+import re
+
+from item_names import singular
+
+# Below this confidence the transcript goes to the LLM
+INTENT_THRESHOLD = float(os.getenv("INTENT_THRESHOLD", 0.8))
+
+# Things people ask the robot to draw, multi-word items included
+LEXICON = {
+    "airplane", "angel", "ant", "apple", "balloon", "banana", "bear", "bee", "bicycle", "bike", "bird",
+    "boat", "book", "bottle", "bridge", "bunny", "butterfly", "cactus", "cake", "camera", "candle", "car",
+    "carrot", "castle", "cat", "chair", "cherry", "circle", "cloud", "clock", "computer", "cow", "crab",
+    "crown", "cup", "diamond", "dinosaur", "dog", "dolphin", "donut", "dragon", "duck", "elephant", "eye",
+    "fish", "flower", "fox", "frog", "ghost", "giraffe", "glasses", "guitar", "hammer", "hat",
+    "heart", "hexagon", "horse", "hot air balloon", "house", "ice cream", "key", "kite", "ladder", "lamp",
+    "leaf", "lemon", "light bulb", "lighthouse", "lion", "lollipop", "moon", "mountain", "mouse",
+    "mushroom", "octopus", "owl", "palm tree", "pear", "pencil", "penguin", "pig", "pineapple", "pizza",
+    "planet", "rabbit", "rainbow", "robot", "rocket", "rose", "sailboat", "shark", "sheep", "shoe",
+    "smiley face", "snail", "snake", "snowman", "spider", "square", "star", "strawberry", "sun",
+    "sword", "table", "teddy bear", "tree", "triangle", "truck", "turtle", "umbrella", "unicorn",
+    "whale", "train", "robot dog",
+}
+
+# Other names of lexicon items
+SYNONYMS = {
+    "happy face": "smiley face", "smiley": "smiley face", "kitty": "cat", "kitten": "cat", "puppy": "dog",
+    "doggy": "dog", "plane": "airplane", "ship": "boat", "home": "house", "lightbulb": "light bulb",
+    "bulb": "light bulb", "teddy": "teddy bear", "icecream": "ice cream",
+}
+
+VERBS = r"draw|sketch|paint|doodle|illustrate|trace|make|create|show|give|want|need"
+FILLERS = r"me|us|for me|for us|out|up|quickly|quick"
+ARTICLES = r"a|an|the|some|one|two|three|a little|a small|a big|a nice|a simple|a cute|my"
+TRAILING = r"please|for me|for us|now|thanks|thank you|right now|if you can|on the paper|on paper|spot"
+
+# "can you please sketch me a cat for me thanks" -> "cat"
+REQUEST = re.compile(
+    rf"^(?:.*?\b)?(?:{VERBS})(?:\s+(?:{FILLERS}))*(?:\s+(?:{ARTICLES}))?\s+"
+    rf"(?:(?:picture|drawing|sketch|doodle) of\s+(?:(?:{ARTICLES})\s+)?)?"
+    rf"(?P<item>[a-z][a-z ]*?)(?:\s+(?:{TRAILING}))*$"
+)
+# Words that may come before the item without changing what it is: "a big red apple"
+ADJECTIVES = {
+    "big", "small", "little", "tiny", "huge", "giant", "large", "cute", "simple", "nice", "happy", "sad",
+    "funny", "scary", "spooky", "pretty", "beautiful", "cool", "easy", "basic", "round", "tall", "fat",
+    "red", "green", "blue", "yellow", "orange", "purple", "pink", "black", "white", "brown",
+    "really", "very", "super",
+}
+# Several requests or a correction in one sentence, the LLM reads those better
+AMBIGUOUS = re.compile(r"\b(?:not|don't|dont|no|instead|or|and|but|actually)\b")
+
+
+def normalize(transcript):
+    text = transcript.lower().replace("’", "'")
+    text = re.sub(r"[^a-z' ]+", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def lexicon_entry(words):
+    # The item a run of words names, the last word as is ("glasses") or singular ("apples")
+    for last in dict.fromkeys((words[-1], singular(words[-1]))):
+        candidate = " ".join(words[:-1] + [last])
+        candidate = SYNONYMS.get(candidate, candidate)
+        if candidate in LEXICON:
+            return candidate
+    return None
+
+
+def known_item(phrase):
+    """
+    Finds the first lexicon item in a phrase, the longest one where several start at the same word.
+    Returns (item, words before it, words after it), item is None when the phrase names none.
+    "big red apples" -> ("apple", ["big", "red"], []), "cat with a hat" -> ("cat", [], ["with", "a", "hat"])
+    """
+    words = phrase.split()
+    for start in range(len(words)):
+        for end in range(len(words), start, -1):
+            item = lexicon_entry(words[start:end])
+            if item is not None:
+                return item, words[:start], words[end:]
+    return None, [], []
+
+
+def extract_intent(transcript):
+    """
+    Finds what to draw in a transcript without the LLM. Returns {"item", "confidence"}, item is None
+    when nothing was found. Confidence is high for a drawing verb followed by a lexicon item with at
+    most adjectives before it, below the threshold when other words come before or after the item
+    or the noun is not in the lexicon, and low for corrections or lists.
+    """
+    text = normalize(transcript)
+    if not text:
+        return {"item": None, "confidence": 0.0}
+
+    # A bare noun: "apple", "a cat"
+    item, before, after = known_item(re.sub(rf"^(?:{ARTICLES})\s+", "", text))
+    if item and not before and not after:
+        return {"item": item, "confidence": 0.9}
+
+    match = REQUEST.match(text)
+    if match is None:
+        return {"item": None, "confidence": 0.0}
+
+    phrase = match.group("item")
+    ambiguous = AMBIGUOUS.search(text) is not None
+    item, before, after = known_item(phrase)
+    if item is None:
+        # A drawing request for something off the lexicon, probably right when it is one word
+        words = phrase.split()
+        confidence = 0.6 if len(words) == 1 and not ambiguous else 0.3
+        return {"item": singular(words[-1]), "confidence": confidence}
+
+    if ambiguous:
+        return {"item": item, "confidence": 0.4}
+    if after or any(word not in ADJECTIVES for word in before):
+        # More than one subject or a scene: "cat with a hat", "boy holding a balloon"
+        return {"item": item, "confidence": 0.5}
+    return {"item": item, "confidence": 0.85 if before else 0.95}
@@ -0,0 +1,18 @@
+# Item name rules the speech recognition and image processing services must agree on, so an item
+# resolved from a transcript finds its library drawing and cache entries.
+#
+# The same module is kept at image-processing/item_names.py and speech-recognition/item_names.py
+# (the services are deployed separately). Edit both, tests/test_item_names_sync.py fails when
+# they differ.
+import re
+
+
+def singular(name):
+    # Naive English singular of the last word, good enough for item lookups
+    if name.endswith("ies") and len(name) > 4:
+        return name[:-3] + "y"
+    if re.search(r"(ss|sh|ch|x)es$", name):
+        return name[:-2]
+    if name.endswith("s") and not name.endswith(("ss", "us", "is")):
+        return name[:-1]
+    return name
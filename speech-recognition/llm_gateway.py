@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+
+import httpx
+from dotenv import load_dotenv
+from openai import OpenAI
+
+load_dotenv()
+
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
+# Point at stub_openai.py (http://localhost:5002/v1) to run without the real API
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", 30.0))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", 2))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", 16))
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", 512))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", 3600.0))
+
+
+def normalize_text(text):
+    # Case and spacing differences of transcripts ask the same thing
+    return re.sub(r"\s+([.,!?])", r"\1", re.sub(r"\s+", " ", text)).strip().lower()
+
+
+def cache_key(model, messages, **options):
+    # Text is compared normalized, images (data URIs or URLs) by their hash
+    def part(content):
+        if isinstance(content, str):
+            return normalize_text(content)
+        if content.get("type") == "text":
+            return {"text": normalize_text(content["text"])}
+        if content.get("type") == "image_url":
+            return {"image": hashlib.sha256(content["image_url"]["url"].encode("utf-8")).hexdigest()}
+        return content
+
+    normalized = [
+        {"role": message["role"],
+         "content": [part(c) for c in message["content"]] if isinstance(message["content"], list)
+         else part(message["content"])}
+        for message in messages
+    ]
+    value = json.dumps({"model": model, "messages": normalized, **options}, sort_keys=True)
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU of at most max_items entries, each expiring ttl seconds after it was stored.
+    """
+
+    def __init__(self, max_items=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                return None
+            stored, value = self._items[key]
+            if time.monotonic() - stored > self.ttl:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = (time.monotonic(), value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class LLMGateway:
+    """
+    One OpenAI client per process, with pooled keep-alive connections, timeouts and retries, in
+    front of a response cache. Safe to call from several threads.
+    """
+
+    def __init__(self, model=OPENAI_MODEL, cache=None):
+        self.model = model
+        self.cache = cache if cache is not None else TTLCache()
+
+        self._client = None
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "cache_hits": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        self._latencies = deque(maxlen=1000)
+
+    @property
+    def client(self):
+        # Created on first use so importing does not need an API key
+        with self._lock:
+            if self._client is None:
+                self._client = OpenAI(
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    base_url=OPENAI_BASE_URL,
+                    timeout=OPENAI_TIMEOUT,
+                    max_retries=OPENAI_MAX_RETRIES,
+                    http_client=httpx.Client(limits=httpx.Limits(
+                        max_connections=OPENAI_MAX_CONNECTIONS,
+                        max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+                    )),
+                )
+            return self._client
+
+    def chat(self, messages, model=None, use_cache=True, **options):
+        # Returns the content of the first choice
+        model = model or self.model
+        key = cache_key(model, messages, **options)
+        with self._lock:
+            self._stats["requests"] += 1
+
+        if use_cache:
+            content = self.cache.get(key)
+            if content is not None:
+                with self._lock:
+                    self._stats["cache_hits"] += 1
+                return content
+
+        start = time.perf_counter()
+        try:
+            response = self.client.chat.completions.create(messages=messages, model=model, **options)
+        except Exception:
+            with self._lock:
+                self._stats["errors"] += 1
+            raise
+        latency = time.perf_counter() - start
+
+        content = response.choices[0].message.content
+        with self._lock:
+            self._latencies.append(latency)
+            if response.usage is not None:
+                self._stats["prompt_tokens"] += response.usage.prompt_tokens
+                self._stats["completion_tokens"] += response.usage.completion_tokens
+        self.cache.put(key, content)
+        return content
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            lookups = self._stats["requests"]
+            return {
+                **self._stats,
+                "hit_rate": self._stats["cache_hits"] / lookups if lookups else 0.0,
+                "cache_entries": len(self.cache),
+                "mean_latency": sum(latencies) / len(latencies) if latencies else 0.0,
+                "p95_latency": latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0,
+            }
+
+
+gateway = LLMGateway()
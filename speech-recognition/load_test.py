@@ -0,0 +1,93 @@
+# Load test of a running speech recognition server.
+#
+#   python load_test.py --url http://localhost:5001 --requests 32 --concurrency 8
+#   python load_test.py --endpoint interpret --requests 64 --concurrency 16
+#
+# Sends --requests calls with --concurrency in flight and reports throughput, latency percentiles
+# and how many were turned away with a 503. Meanwhile GET / is polled to show whether the event
+# loop stays responsive while transcriptions run. Prints the server's /metrics at the end.
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+import numpy as np
+
+
+async def call(client, options, audio):
+    start = time.perf_counter()
+    if options.endpoint == "recognize":
+        response = await client.post("/recognize", files={"audio_file": ("recording.wav", audio)})
+    else:
+        response = await client.post("/interpret", json=options.transcript)
+    return response.status_code, time.perf_counter() - start
+
+
+async def probe(client, stop, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.05)
+
+
+async def run(options):
+    with open(options.audio, "rb") as f:
+        audio = f.read()
+
+    limits = httpx.Limits(max_connections=options.concurrency + 1)
+    async with httpx.AsyncClient(base_url=options.url, timeout=options.timeout, limits=limits) as client:
+        slots = asyncio.Semaphore(options.concurrency)
+
+        async def limited():
+            async with slots:
+                try:
+                    return await call(client, options, audio)
+                except httpx.HTTPError as e:
+                    return type(e).__name__, None
+
+        stop = asyncio.Event()
+        probe_latencies = []
+        prober = asyncio.create_task(probe(client, stop, probe_latencies))
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(limited() for _ in range(options.requests)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await prober
+
+        metrics = (await client.get("/metrics")).json()
+
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    ok = [latency for status, latency in results if status == 200]
+
+    print(f"{options.requests} {options.endpoint} requests, {options.concurrency} concurrent, {elapsed:.2f}s")
+    print(f"  statuses   {statuses}")
+    if ok:
+        print(f"  throughput {len(ok) / elapsed:.2f} ok/s")
+        print(f"  latency    p50 {np.percentile(ok, 50):.2f}s, p95 {np.percentile(ok, 95):.2f}s")
+    if probe_latencies:
+        print(f"  GET /      p50 {np.percentile(probe_latencies, 50) * 1000:.1f}ms, "
+              f"max {max(probe_latencies) * 1000:.1f}ms over {len(probe_latencies)} probes")
+    print(json.dumps(metrics, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:5001")
+    parser.add_argument("--endpoint", default="recognize", choices=["recognize", "interpret"])
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--audio", default="audio_samples/test.wav", help="File uploaded to /recognize")
+    # Off the intent lexicon, so the default exercises the OpenAI stage rather than the local resolver
+    parser.add_argument("--transcript", default="I was thinking maybe a unicorn would be fun",
+                        help="Body sent to /interpret")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
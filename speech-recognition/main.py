@@ -1,12 +1,82 @@
-from fastapi import FastAPI, UploadFile, File, Body
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Body, Request, WebSocket, WebSocketDisconnect
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from whisper_recognition import transcribe_audio
-from open_ai_recognition import interpret_audio
+from audio import MAX_UPLOAD_BYTES, AudioDecodeError, UploadTooLarge, read_upload
+from streaming import STREAM_IDLE_SECONDS, StreamingRecognizer
+from whisper_recognition import WHISPER_MODEL, load_model, model_status, transcribe_audio, transcribe_upload
+from open_ai_recognition import intent_stats, interpret_locally, interpret_with_llm
 from open_ai_eval import evaluate_images
+from llm_gateway import gateway
+from workers import Stage, StageBroken, StageSaturated
 import uvicorn
 
-app = FastAPI()
+# Whisper processes per uvicorn worker, each holds its own model, and how many requests may wait for one
+WHISPER_WORKERS = int(os.getenv("WHISPER_WORKERS", 1))
+WHISPER_QUEUE = int(os.getenv("WHISPER_QUEUE", 4))
+# Concurrent OpenAI calls (network bound, threads are enough) and how many may wait
+OPENAI_CONCURRENCY = int(os.getenv("OPENAI_CONCURRENCY", 8))
+OPENAI_QUEUE = int(os.getenv("OPENAI_QUEUE", 16))
+
+stages = {}
+whisper_status = {"model": WHISPER_MODEL, "loaded": False, "error": None}
+background = set()
+
+
+async def load_whisper(stage):
+    # Every Whisper process loads and warms up its model as it starts, the first one to answer means
+    # requests can be served
+    try:
+        status = await asyncio.get_running_loop().run_in_executor(stage.executor, model_status)
+    except Exception as e:
+        status = {"loaded": False, "error": str(e)}
+    whisper_status.update(status)
+
+
+def whisper_pool():
+    # Whisper processes are spawned, forking a process with threads and torch state is unsafe
+    return ProcessPoolExecutor(WHISPER_WORKERS, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=load_model)
+
+
+def restart_whisper():
+    # A Whisper process died, loading its model for one, and took the pool with it. Requests are
+    # reported as not ready until the processes of the new pool load their model.
+    whisper_status.update(loaded=False, error="Whisper workers stopped, restarting them")
+    pool = whisper_pool()
+    loading = asyncio.get_running_loop().create_task(load_whisper(stages["whisper"]))
+    # The loop keeps only weak references to tasks
+    background.add(loading)
+    loading.add_done_callback(background.discard)
+    return pool
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Blocking work runs on these pools so the event loop keeps answering while it does.
+    stages["whisper"] = Stage("whisper", whisper_pool(), WHISPER_WORKERS, WHISPER_QUEUE, restart=restart_whisper)
+    stages["openai"] = Stage("openai", ThreadPoolExecutor(OPENAI_CONCURRENCY), OPENAI_CONCURRENCY, OPENAI_QUEUE)
+    loading = asyncio.create_task(load_whisper(stages["whisper"]))
+    yield
+    loading.cancel()
+    for stage in stages.values():
+        stage.shutdown()
+
+
+def saturated(e):
+    return JSONResponse(
+        status_code=503,
+        content={"error": "Service Unavailable", "details": str(e)},
+        headers={"Retry-After": "1"},
+    )
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,31 +86,88 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    # Rejects uploads announced as too large before reading them, read_upload also enforces the
+    # limit as chunked bodies without a Content-Length arrive
+    content_length = request.headers.get("content-length")
+    if request.method != "POST" or not content_length:
+        return await call_next(request)
+    try:
+        announced = int(content_length)
+    except ValueError:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "Bad Request", "details": f"Invalid Content-Length: {content_length}"},
+        )
+    if announced > MAX_UPLOAD_BYTES:
+        return JSONResponse(
+            status_code=413,
+            content={"error": "Payload Too Large", "details": f"Uploads are limited to {MAX_UPLOAD_BYTES} bytes"},
+        )
+    return await call_next(request)
+
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to AI Hackathon 2024!"}
 
 
-@app.post("/recognize")
-async def recognize(audio_file: UploadFile = File(...)):
+@app.get("/ready")
+async def ready():
+    status = dict(whisper_status)
+    return JSONResponse(status_code=200 if status["loaded"] else 503, content={"ready": status["loaded"], **status})
+
+
+@app.get("/metrics")
+async def metrics():
+    # Per stage: active and queued calls, completed, failed and rejected counts, mean run and wait times.
+    # llm: OpenAI requests, cache hits, tokens and latency. intent: transcripts resolved locally or by the LLM.
+    return {**{name: stage.stats() for name, stage in stages.items()}, "llm": gateway.stats(),
+            "intent": dict(intent_stats)}
+
+
+# The body is read from the request stream by read_upload rather than declared as an UploadFile,
+# which Starlette would receive whole into a temporary file before the size limit could apply
+RECOGNIZE_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"audio_file": {"type": "string", "format": "binary"}},
+                    "required": ["audio_file"],
+                }
+            }
+        },
+    }
+}
+
+
+@app.post("/recognize", openapi_extra=RECOGNIZE_BODY)
+async def recognize(request: Request):
     try:
-        # Log the filename and content type
-        print(
-            f"Received file: {audio_file.filename}, Content-Type: {audio_file.content_type}"
-        )
+        # Read as it arrives, decoded in memory by the Whisper process. Set DEBUG_UPLOAD_DIR to
+        # also keep a copy on disk.
+        data = await read_upload(request)
 
-        # Save the uploaded audio file temporarily (for debugging purposes)
-        with open(audio_file.filename, "wb") as buffer:
-            buffer.write(await audio_file.read())
+        # Log the size and content type
+        print(f"Received {len(data)} bytes of audio, Content-Type: {request.headers.get('content-type')}")
 
-        # Call the transcribe_audio function with the path of the saved audio file
-        transcription = transcribe_audio(audio_file.filename)
+        transcription = await stages["whisper"].run(transcribe_upload, data)
 
         # Return the transcription result
         return {
             "message": "Audio file received and transcribed successfully",
             "transcription": transcription,
         }
+    except (StageSaturated, StageBroken) as e:
+        return saturated(e)
+    except UploadTooLarge as e:
+        return JSONResponse(status_code=413, content={"error": "Payload Too Large", "details": str(e)})
+    except AudioDecodeError as e:
+        return JSONResponse(status_code=400, content={"error": "Bad Request", "details": str(e)})
     except Exception as e:
         # Log any errors that occur during processing
         print(f"Error processing audio file: {e}")
@@ -51,14 +178,85 @@ async def recognize(audio_file: UploadFile = File(...)):
         )
 
 
+@app.websocket("/ws/recognize")
+async def recognize_stream(websocket: WebSocket, encoding: str = "pcm_s16le"):
+    # Binary messages are audio chunks: 16 kHz mono s16le PCM, or with ?encoding=webm the chunks of
+    # a MediaRecorder stream. The server sends {"type": "partial", "text"} as audio comes in and
+    # {"type": "final", "text", "transcription"} of all the audio once speech ends, the client sends
+    # the text "end" or nothing arrives for STREAM_IDLE_SECONDS, then closes.
+    # {"type": "error", "details"} is sent instead when the final transcript fails.
+    await websocket.accept()
+    recognizer = StreamingRecognizer(encoding)
+    whisper = stages["whisper"]
+    partial = None
+    received = 0
+
+    async def send_partial(samples):
+        # Partials are best effort, a failed one is skipped and the final transcript still gets its turn
+        try:
+            result = await whisper.run(transcribe_audio, samples)
+            await websocket.send_json({"type": "partial", "text": result["text"], "seconds": recognizer.seconds})
+        except StageSaturated:
+            pass
+        except Exception as e:
+            print(f"Error transcribing partial audio: {e}")
+
+    try:
+        while not recognizer.speech_ended():
+            try:
+                message = await asyncio.wait_for(websocket.receive(), STREAM_IDLE_SECONDS)
+            except asyncio.TimeoutError:
+                break
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("text") == "end":
+                break
+            if message.get("bytes"):
+                received += len(message["bytes"])
+                if received > MAX_UPLOAD_BYTES:
+                    await websocket.send_json({"type": "error", "details": "Stream is too large"})
+                    break
+                await asyncio.to_thread(recognizer.add, message["bytes"])
+
+            # One transcription in flight per stream, audio keeps buffering meanwhile
+            if recognizer.partial_due() and (partial is None or partial.done()):
+                partial = asyncio.create_task(send_partial(recognizer.window()))
+
+        await asyncio.to_thread(recognizer.finish)
+        if partial is not None:
+            await partial
+        if received <= MAX_UPLOAD_BYTES:
+            try:
+                # Whisper slides its 30 s window over longer audio itself
+                transcription = await whisper.run(transcribe_audio, recognizer.samples)
+            except Exception as e:
+                await websocket.send_json({"type": "error", "details": str(e)})
+            else:
+                await websocket.send_json({"type": "final", "text": transcription["text"],
+                                           "transcription": transcription})
+        await websocket.close()
+    except WebSocketDisconnect:
+        if partial is not None:
+            partial.cancel()
+    finally:
+        await asyncio.to_thread(recognizer.finish)
+
+
 @app.post("/interpret")
 async def interpret(transcript: str = Body(...)):
     try:
-        result = interpret_audio(transcript)
+        # Common phrasings are resolved locally, the rest goes to the LLM
+        result = interpret_locally(transcript)
+        source = "local" if result else "llm"
+        if result is None:
+            result = await stages["openai"].run(interpret_with_llm, transcript)
         return {
             "message": "Transcription interpreted successfully",
             "result": result,
+            "source": source,
         }
+    except StageSaturated as e:
+        return saturated(e)
     except Exception as e:
         # Log and return error response
         print(f"Error interpreting transcript: {e}")
@@ -70,7 +268,10 @@ async def interpret(transcript: str = Body(...)):
 
 @app.post("/eval")
 async def eval(item: str = Body(...), images: list = Body(...)):
-    result = evaluate_images(images, item)
+    try:
+        result = await stages["openai"].run(evaluate_images, images, item)
+    except StageSaturated as e:
+        return saturated(e)
     return {
         "message": "Evaluation interpreted successfully",
         "result": result,
@@ -1,19 +1,9 @@
-import os
-from openai import OpenAI
-from dotenv import load_dotenv
+from llm_gateway import gateway
 
 
 # takes in a list of base64 encoded images and returns a winner, a sungle choice as JSON
 def evaluate_images(images, item):
 
-    # Load the environment variables from the .env file
-    load_dotenv()
-
-    client = OpenAI(
-        # Get the API key from the environment variables
-        api_key=os.getenv("OPENAI_API_KEY")
-    )
-
     # create the payload
     messages = [
         {
@@ -33,11 +23,5 @@ def evaluate_images(images, item):
             {"type": "image_url", "image_url": {"url": image}}
         )
 
-    # send the payload to the API
-    response = client.chat.completions.create(
-        messages=messages,
-        model="gpt-4o",
-    )
-
-    # return the result
-    return response.choices[0].message.content
+    # send the payload through the gateway, the same item and images are answered from its cache
+    return gateway.chat(messages=messages)
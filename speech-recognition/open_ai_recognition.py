@@ -1,18 +1,24 @@
-import os
-from openai import OpenAI
-from dotenv import load_dotenv
+import threading
 
+from intent import INTENT_THRESHOLD, extract_intent
+from llm_gateway import gateway
 
-def interpret_audio(audio_command: str):
-    # Load the environment variables from the .env file
-    load_dotenv()
+intent_stats = {"local": 0, "llm": 0}
+_stats_lock = threading.Lock()
 
-    client = OpenAI(
-        # Get the API key from the environment variables
-        api_key=os.getenv("OPENAI_API_KEY")
-    )
 
-    chat_completion = client.chat.completions.create(
+def interpret_locally(audio_command: str):
+    # The item when the local extractor is confident enough, None when the LLM has to decide
+    intent = extract_intent(audio_command)
+    source = "local" if intent["confidence"] >= INTENT_THRESHOLD else "llm"
+    with _stats_lock:
+        intent_stats[source] += 1
+    # Capitalized like the one word answers of the LLM
+    return intent["item"].capitalize() if source == "local" else None
+
+
+def interpret_with_llm(audio_command: str):
+    return gateway.chat(
         messages=[
             {
                 "role": "user",
@@ -21,7 +27,8 @@ def interpret_audio(audio_command: str):
                 + ". Can you extract and tell me in one word, what I should draw?",
             }
         ],
-        model="gpt-4o",
     )
 
-    return chat_completion.choices[0].message.content
+
+def interpret_audio(audio_command: str):
+    return interpret_locally(audio_command) or interpret_with_llm(audio_command)
@@ -0,0 +1,66 @@
+# Streams an audio file to /ws/recognize like a live recording and prints the transcripts.
+#
+#   python stream_client.py audio_samples/test.wav
+#   python stream_client.py recording.wav --url ws://localhost:5001 --speed 2
+#
+# The file is decoded to 16 kHz mono PCM and sent in --chunk second pieces at --speed times real
+# time, followed by a second of silence so the server can detect the end of speech. Prints every
+# transcript with the audio position it arrived at and the time since the latest chunk was sent.
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+import websockets
+
+from audio import SAMPLE_RATE, decode_audio
+
+TRAILING_SILENCE_SECONDS = 1.0
+
+
+async def stream(options):
+    with open(options.file, "rb") as f:
+        samples = decode_audio(f.read())
+    samples = np.concatenate((samples, np.zeros(int(TRAILING_SILENCE_SECONDS * SAMPLE_RATE), np.float32)))
+    pcm = (np.clip(samples, -1, 1) * 32767).astype(np.int16).tobytes()
+    chunk_bytes = int(options.chunk * SAMPLE_RATE) * 2
+
+    async with websockets.connect(f"{options.url}/ws/recognize?encoding=pcm_s16le") as websocket:
+        start = time.perf_counter()
+        sent = {"seconds": 0.0, "at": start}
+
+        async def send():
+            for offset in range(0, len(pcm), chunk_bytes):
+                await websocket.send(pcm[offset:offset + chunk_bytes])
+                sent["seconds"] = min(offset + chunk_bytes, len(pcm)) / 2 / SAMPLE_RATE
+                sent["at"] = time.perf_counter()
+                await asyncio.sleep(options.chunk / options.speed)
+            await websocket.send("end")
+
+        sender = asyncio.create_task(send())
+        try:
+            async for message in websocket:
+                result = json.loads(message)
+                if result["type"] in ("partial", "final"):
+                    print(f"{sent['seconds']:6.2f}s +{time.perf_counter() - sent['at']:.2f}s  "
+                          f"{result['type']:>7}: {result['text'].strip()}")
+                else:
+                    print(f"error: {result['details']}")
+        except websockets.ConnectionClosed:
+            pass
+        sender.cancel()
+        print(f"{len(samples) / SAMPLE_RATE:.2f}s of audio streamed in {time.perf_counter() - start:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("file", help="Audio file to stream, any format ffmpeg reads")
+    parser.add_argument("--url", default="ws://localhost:5001")
+    parser.add_argument("--chunk", type=float, default=0.25, help="Seconds of audio per message")
+    parser.add_argument("--speed", type=float, default=1.0, help="Times real time")
+    asyncio.run(stream(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import os
+import subprocess
+import threading
+
+import numpy as np
+
+from audio import SAMPLE_RATE
+
+# A partial transcript every STEP seconds of new audio, over at most the last WINDOW seconds
+# (Whisper sees 30 seconds at a time)
+STREAM_STEP_SECONDS = float(os.getenv("STREAM_STEP_SECONDS", 1.0))
+STREAM_WINDOW_SECONDS = float(os.getenv("STREAM_WINDOW_SECONDS", 30.0))
+# Speech has ended after this much audio below the energy threshold, once speech was heard
+END_SILENCE_SECONDS = float(os.getenv("END_SILENCE_SECONDS", 0.8))
+SPEECH_THRESHOLD = float(os.getenv("SPEECH_THRESHOLD", 0.01))  # RMS of float samples
+# A stream that sends nothing for this long is finished with what it sent so far
+STREAM_IDLE_SECONDS = float(os.getenv("STREAM_IDLE_SECONDS", 10.0))
+
+FRAME = SAMPLE_RATE // 50  # 20 ms energy frames
+
+
+class FfmpegDecoder:
+    """
+    One ffmpeg process decoding a container stream (WebM from a MediaRecorder) as it is written,
+    every byte is decoded once. A thread collects the 16 kHz mono PCM ffmpeg writes out.
+    """
+
+    def __init__(self):
+        self.process = subprocess.Popen(
+            ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", "pipe:0",
+             "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE), "pipe:1"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        self._output = bytearray()
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._reader.start()
+
+    def _read(self):
+        while chunk := self.process.stdout.read1(64 * 1024):
+            with self._lock:
+                self._output += chunk
+
+    def write(self, chunk):
+        try:
+            self.process.stdin.write(chunk)
+            self.process.stdin.flush()
+        except BrokenPipeError:
+            pass  # ffmpeg gave up on the stream, nothing more will be decoded
+
+    def read(self):
+        # The PCM bytes decoded since the last read
+        with self._lock:
+            output = bytes(self._output)
+            del self._output[:]
+        return output
+
+    def close(self, timeout=5.0):
+        # Ends the input and waits for ffmpeg to flush what it still holds
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        self._reader.join(timeout)
+        if self.process.poll() is None:
+            self.process.kill()
+        return self.read()
+
+
+class StreamingRecognizer:
+    """
+    Audio state of one streaming session. Chunks are raw 16 kHz mono s16le PCM, or pieces of one
+    container stream (the WebM a MediaRecorder emits) that go through an FfmpegDecoder. Tracks when
+    a partial transcript is due and when speech ended.
+    """
+
+    def __init__(self, encoding="pcm_s16le"):
+        self.encoding = encoding
+        self.samples = np.zeros(0, np.float32)
+        self._encoded = bytearray()
+        self._decoder = None if encoding == "pcm_s16le" else FfmpegDecoder()
+        self._transcribed = 0  # samples covered by the last transcript
+        self._heard_speech = False
+        self._silent_frames = 0
+        self._scanned = 0  # samples already looked at for speech
+
+    def add(self, chunk):
+        if self._decoder is None:
+            self._append(chunk)
+        else:
+            self._decoder.write(chunk)
+            self._append(self._decoder.read())
+
+    def finish(self):
+        # Called once no more audio will come, collects what the decoder still holds
+        if self._decoder is not None:
+            self._append(self._decoder.close())
+            self._decoder = None
+
+    def _append(self, pcm):
+        # A chunk boundary can split a sample, keep the odd byte for the next chunk
+        self._encoded += pcm
+        usable = len(self._encoded) - len(self._encoded) % 2
+        new = np.frombuffer(bytes(self._encoded[:usable]), np.int16).astype(np.float32) / 32768.0
+        del self._encoded[:usable]
+        self.samples = np.concatenate((self.samples, new))
+        self._scan()
+
+    def _scan(self):
+        # Energy based end of speech detection over the frames not seen yet
+        while self._scanned + FRAME <= len(self.samples):
+            frame = self.samples[self._scanned:self._scanned + FRAME]
+            self._scanned += FRAME
+            if np.sqrt(np.mean(frame ** 2)) >= SPEECH_THRESHOLD:
+                self._heard_speech = True
+                self._silent_frames = 0
+            else:
+                self._silent_frames += 1
+
+    @property
+    def seconds(self):
+        return len(self.samples) / SAMPLE_RATE
+
+    def speech_ended(self):
+        return self._heard_speech and self._silent_frames * FRAME >= END_SILENCE_SECONDS * SAMPLE_RATE
+
+    def partial_due(self):
+        return self._heard_speech and len(self.samples) - self._transcribed >= STREAM_STEP_SECONDS * SAMPLE_RATE
+
+    def window(self):
+        # The latest WINDOW seconds for a partial transcript, marked as transcribed
+        self._transcribed = len(self.samples)
+        return self.samples[-int(STREAM_WINDOW_SECONDS * SAMPLE_RATE):]
@@ -0,0 +1,67 @@
+# Local stand-in for the OpenAI chat completions API.
+#
+#   python stub_openai.py --port 5002 --latency 0.5
+#   OPENAI_BASE_URL=http://localhost:5002/v1 OPENAI_API_KEY=stub fastapi dev main.py
+#
+# Answers POST /v1/chat/completions without a model: the item to draw is the last word of the
+# command for intent prompts, and image evaluations always pick the first image. Responses carry
+# token usage like the real API. GET /stats returns how many completions were served.
+import argparse
+import asyncio
+import re
+import time
+
+import uvicorn
+from fastapi import Body, FastAPI
+
+app = FastAPI()
+served = {"completions": 0}
+options = argparse.Namespace(latency=0.0)
+
+
+def answer(messages):
+    content = messages[-1]["content"]
+    if isinstance(content, list):
+        return "1"
+    command = re.search(r"I received this command: (.*)\. Can you extract", content, re.S)
+    words = re.findall(r"[a-zA-Z]+", command.group(1) if command else content)
+    return words[-1].capitalize() if words else "Nothing"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: dict = Body(...)):
+    # Waits without blocking the event loop, a slow upstream serves its clients concurrently
+    await asyncio.sleep(options.latency)
+    served["completions"] += 1
+
+    content = answer(request["messages"])
+    prompt_tokens = sum(len(str(message["content"])) // 4 for message in request["messages"])
+    return {
+        "id": f"chatcmpl-stub-{served['completions']}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "stub"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": 1,
+            "total_tokens": prompt_tokens + 1,
+        },
+    }
+
+
+@app.get("/stats")
+async def stats():
+    return served
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=5002)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds every completion takes")
+    options = parser.parse_args()
+    uvicorn.run(app, host="0.0.0.0", port=options.port)
@@ -1,7 +1,60 @@
+import os
+import threading
+import time
+
+import numpy as np
 import whisper
 
+from audio import decode_audio
+
+# Model size ("tiny", "base", "small", "medium", "large"), loaded once per worker process
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+WHISPER_DEVICE = os.getenv("WHISPER_DEVICE")  # None lets whisper pick cuda when available
+
+_model = None
+_load_lock = threading.Lock()
+# Whisper installs its kv-cache hooks on the model for every decode, so calls must not overlap
+_inference_lock = threading.Lock()
+_status = {"model": WHISPER_MODEL, "loaded": False, "load_seconds": None, "warmup_seconds": None, "error": None}
+
+
+def load_model(warmup=True):
+    # Loads the model on first call, later calls (and calls waiting on the first) get the same one
+    global _model
+    with _load_lock:
+        if _model is not None:
+            return _model
+
+        try:
+            start = time.perf_counter()
+            model = whisper.load_model(WHISPER_MODEL, device=WHISPER_DEVICE)
+            _status["load_seconds"] = time.perf_counter() - start
+
+            if warmup:
+                # One second of silence runs every kernel once, so the first request pays only inference
+                start = time.perf_counter()
+                model.transcribe(np.zeros(whisper.audio.SAMPLE_RATE, dtype=np.float32))
+                _status["warmup_seconds"] = time.perf_counter() - start
+        except Exception as e:
+            _status["error"] = str(e)
+            raise
+
+        _model = model
+        _status.update(loaded=True, error=None)
+        return _model
+
+
+def model_status():
+    return dict(_status)
+
+
+def transcribe_audio(audio):
+    # audio is a file path or 16 kHz mono float32 samples
+    model = load_model()
+    with _inference_lock:
+        return model.transcribe(audio)
+
 
-def transcribe_audio(audio_path: str):
-    model = whisper.load_model("base")
-    result = model.transcribe(audio_path)
-    return result
+def transcribe_upload(data):
+    # Decodes and transcribes an uploaded file, what the Whisper worker processes run
+    return transcribe_audio(decode_audio(data))
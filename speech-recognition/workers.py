@@ -0,0 +1,88 @@
+import asyncio
+import time
+from concurrent.futures import BrokenExecutor
+from functools import partial
+
+
+class StageSaturated(Exception):
+    pass
+
+
+class StageBroken(Exception):
+    pass
+
+
+class Stage:
+    """
+    Runs blocking calls of one pipeline stage on an executor from async handlers. At most
+    `concurrency` calls run at once and `max_queue` more wait for a slot, anything past that raises
+    StageSaturated right away instead of queueing without bound. Only used from the event loop, so
+    the counters need no lock.
+    An executor breaks for good when one of its processes dies, a model failing to load for one.
+    Calls then raise StageBroken and, given `restart`, a callable returning a new executor, the
+    stage replaces the broken one so the next calls can succeed.
+    """
+
+    def __init__(self, name, executor, concurrency, max_queue, restart=None):
+        self.name = name
+        self.executor = executor
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.restart = restart
+
+        self._slots = asyncio.Semaphore(concurrency)
+        self._stats = {"active": 0, "queued": 0, "completed": 0, "failed": 0, "rejected": 0, "restarts": 0}
+        self._busy_seconds = 0.0
+        self._wait_seconds = 0.0
+
+    async def run(self, function, *args, **kwargs):
+        if self._stats["active"] + self._stats["queued"] >= self.concurrency + self.max_queue:
+            self._stats["rejected"] += 1
+            raise StageSaturated(f"{self.name} is at capacity, retry later")
+
+        self._stats["queued"] += 1
+        queued = time.perf_counter()
+        async with self._slots:
+            self._stats["queued"] -= 1
+            self._stats["active"] += 1
+            started = time.perf_counter()
+            self._wait_seconds += started - queued
+            executor = self.executor
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(
+                    executor, partial(function, *args, **kwargs)
+                )
+            except BrokenExecutor as e:
+                self._stats["failed"] += 1
+                self._replace(executor)
+                raise StageBroken(f"{self.name} workers stopped, {e}") from e
+            except Exception:
+                self._stats["failed"] += 1
+                raise
+            else:
+                self._stats["completed"] += 1
+                return result
+            finally:
+                self._stats["active"] -= 1
+                self._busy_seconds += time.perf_counter() - started
+
+    def _replace(self, broken):
+        # Calls that were running on the broken executor all fail, only the first one replaces it
+        if self.restart is None or self.executor is not broken:
+            return
+        self.executor = self.restart()
+        self._stats["restarts"] += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        done = self._stats["completed"] + self._stats["failed"]
+        return {
+            **self._stats,
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "mean_seconds": self._busy_seconds / done if done else 0.0,
+            "mean_wait_seconds": self._wait_seconds / done if done else 0.0,
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,50 @@
+# Centerline mode exists to draw faster than outline mode, these checks compare the two on the
+# stub icons batch.py makes for load tests.
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "image-processing"))
+
+from batch import stub_array  # noqa: E402
+from engine import estimate_drawing_time, trace_paths, trace_skeleton  # noqa: E402
+
+# Icons whose outline traces every line. The outline of the others is only their silhouette
+# (outer contours), which leaves out the lines inside and is not the same drawing.
+ITEMS = ["apple", "star", "house", "sun", "heart", "boat"]
+
+
+def estimate(item, mode):
+    traced = trace_paths(stub_array(item), mode=mode)
+    return estimate_drawing_time(traced["paths"], traced["size"])
+
+
+@pytest.mark.parametrize("item", ITEMS)
+def test_centerline_is_no_slower_than_outline(item):
+    outline, centerline = estimate(item, "outline"), estimate(item, "centerline")
+    assert centerline["strokes"] <= outline["strokes"]
+    assert centerline["seconds"] <= outline["seconds"]
+
+
+def test_crossing_lines_stay_whole():
+    skeleton = np.zeros((60, 60), dtype=bool)
+    skeleton[30, 5:55] = True
+    skeleton[5:55, 30] = True
+    assert len(trace_skeleton(skeleton)) == 2
+
+
+def test_short_isolated_strokes_are_kept():
+    skeleton = np.zeros((20, 20), dtype=bool)
+    skeleton[10, 5:9] = True
+    assert len(trace_skeleton(skeleton, spur_length=10)) == 1
+
+
+def test_spurs_are_dropped():
+    skeleton = np.zeros((60, 60), dtype=bool)
+    skeleton[30, 5:55] = True
+    skeleton[25:30, 20] = True
+    polylines = trace_skeleton(skeleton, spur_length=10)
+    assert len(polylines) == 1
+    assert np.ptp(polylines[0][:, 1]) == 0
@@ -0,0 +1,32 @@
+# Item names are normalized by the speech recognition service (intent.py) and the image processing
+# service (library.py), each from its own copy of item_names.py. These checks fail when the copies
+# drift apart.
+import importlib.util
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+COPIES = [
+    ROOT / "image-processing" / "item_names.py",
+    ROOT / "speech-recognition" / "item_names.py",
+]
+
+
+def load(path, name):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_copies_are_identical():
+    image_processing_copy, speech_recognition_copy = (path.read_bytes() for path in COPIES)
+    assert image_processing_copy == speech_recognition_copy, f"{COPIES[0]} and {COPIES[1]} differ, keep them in sync"
+
+
+def test_singular():
+    item_names = load(COPIES[0], "item_names")
+    cases = {
+        "apples": "apple", "cherries": "cherry", "boxes": "box", "glasses": "glass", "cactus": "cactus",
+        "bus": "bus", "fish": "fish",
+    }
+    assert {word: item_names.singular(word) for word in cases} == cases
@@ -0,0 +1,31 @@
+# Progress along a body path as move_along_path reports it, from the pose the robot reports.
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("bosdyn.client")
+
+spec = importlib.util.spec_from_file_location(
+    "move", Path(__file__).resolve().parents[1] / "automation" / "api" / "application" / "services" / "gcode" / "move.py"
+)
+move = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(move)
+
+PATH = [move.SE2Pose(0, 0, 0), move.SE2Pose(1, 0, 0), move.SE2Pose(1, 1, 0), move.SE2Pose(0, 0, 0)]
+
+
+def test_progress_follows_the_closest_leg():
+    assert move.path_progress(PATH, move.SE2Pose(0.5, 0.1, 0)) == (0, pytest.approx(0.5 / (2 + 2 ** 0.5)))
+    assert move.path_progress(PATH, move.SE2Pose(1.05, 0.5, 0)) == (1, pytest.approx(1.5 / (2 + 2 ** 0.5)))
+
+
+def test_progress_does_not_go_back_to_walked_legs():
+    # The last leg ends where the first one starts
+    leg, fraction = move.path_progress(PATH, move.SE2Pose(0.1, 0.05, 0), first_leg=2)
+    assert leg == 2
+    assert fraction > 0.9
+
+
+def test_turning_in_place_has_no_length():
+    assert move.path_progress([move.SE2Pose(0, 0, 0), move.SE2Pose(0, 0, 1)], move.SE2Pose(0, 0, 0.5)) == (0, 0.0)
@@ -0,0 +1,36 @@
+# Round trips of the binary toolpath format, on the vectorizer's copy of toolpath.py (the copies are
+# identical, see test_toolpath_sync.py).
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+spec = importlib.util.spec_from_file_location(
+    "toolpath", Path(__file__).resolve().parents[1] / "image-processing" / "toolpath.py"
+)
+toolpath = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(toolpath)
+
+
+@pytest.mark.parametrize("coordinate", [2147.483, 2147.484, -2147.485, 1e6, -1e9])
+def test_large_coordinates_round_trip(coordinate):
+    paths = [np.array([[0.0, 0.0], [coordinate, -coordinate], [1.5, coordinate]])]
+    gcode = toolpath.to_gcode(toolpath.paths_to_strokes(paths))
+
+    data = toolpath.gcode_to_toolpath(gcode)
+    assert toolpath.toolpath_to_gcode(data) == "\n".join(gcode)
+    assert toolpath.read_header(data)["max"][0] == pytest.approx(max(coordinate, 1.5))
+
+
+@pytest.mark.parametrize("coordinate", [1e16, -1e16, np.inf, np.nan])
+def test_out_of_range_coordinates_raise(coordinate):
+    with pytest.raises(ValueError):
+        toolpath.encode([(True, [[0.0, 0.0], [coordinate, 0.0]])])
+
+
+def test_other_versions_are_rejected():
+    data = bytearray(toolpath.encode([(True, [[1.0, 2.0]])]))
+    data[4] = 1
+    with pytest.raises(ValueError, match="version"):
+        toolpath.decode(bytes(data))
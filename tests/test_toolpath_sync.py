@@ -0,0 +1,38 @@
+# The toolpath format is encoded by the vectorizer and decoded by the automation API, each from its
+# own copy of toolpath.py (the two services are deployed separately). These checks fail when the
+# copies drift apart.
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+COPIES = [
+    ROOT / "image-processing" / "toolpath.py",
+    ROOT / "automation" / "api" / "application" / "services" / "gcode" / "toolpath.py",
+]
+
+
+def load(path, name):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_copies_are_identical():
+    vectorizer_copy, automation_copy = (path.read_bytes() for path in COPIES)
+    assert vectorizer_copy == automation_copy, f"{COPIES[0]} and {COPIES[1]} differ, keep them in sync"
+
+
+def test_copies_read_each_other():
+    vectorizer_toolpath = load(COPIES[0], "vectorizer_toolpath")
+    automation_toolpath = load(COPIES[1], "automation_toolpath")
+
+    rng = np.random.default_rng(0)
+    paths = [np.round(rng.uniform(0, 500, (int(rng.integers(1, 40)), 2)), 3) for _ in range(20)]
+    gcode = vectorizer_toolpath.to_gcode(vectorizer_toolpath.paths_to_strokes(paths))
+
+    data = vectorizer_toolpath.gcode_to_toolpath(gcode)
+    assert automation_toolpath.toolpath_to_gcode(data) == "\n".join(gcode)
+    assert automation_toolpath.gcode_to_toolpath(gcode) == data
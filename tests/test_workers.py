@@ -0,0 +1,49 @@
+# Stage restarts its executor when a worker process dies, like a Whisper process failing to load.
+import asyncio
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "speech-recognition"))
+
+from workers import Stage, StageBroken  # noqa: E402
+
+CONTEXT = multiprocessing.get_context("fork")
+
+
+def fail_to_load():
+    raise RuntimeError("model failed to load")
+
+
+def test_broken_pool_is_replaced():
+    async def scenario():
+        stage = Stage("test", ProcessPoolExecutor(1, mp_context=CONTEXT, initializer=fail_to_load), 1, 4,
+                      restart=lambda: ProcessPoolExecutor(1, mp_context=CONTEXT))
+        try:
+            with pytest.raises(StageBroken):
+                await stage.run(abs, -3)
+            assert await stage.run(abs, -3) == 3
+            return stage.stats()
+        finally:
+            stage.shutdown()
+
+    stats = asyncio.run(scenario())
+    assert stats["restarts"] == 1
+    assert stats["failed"] == 1
+    assert stats["completed"] == 1
+
+
+def test_broken_pool_without_restart_keeps_failing():
+    async def scenario():
+        stage = Stage("test", ProcessPoolExecutor(1, mp_context=CONTEXT, initializer=fail_to_load), 1, 4)
+        try:
+            for _ in range(2):
+                with pytest.raises(StageBroken):
+                    await stage.run(abs, -3)
+        finally:
+            stage.shutdown()
+
+    asyncio.run(scenario())